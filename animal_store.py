@@ -0,0 +1,254 @@
+# Featured animal store
+# The curated dataset lives in featured_animals.jsonl (one record per line,
+# default fields omitted). On first use it is packed into a SQLite index
+# with a category/position index and precomputed category counts; the
+# index is rebuilt automatically when the JSONL changes. Category pages
+# read only the card columns, and a full record is decoded into a dict only
+# when its detail page is shown, so import time and memory stay flat as
+# the dataset grows.
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+import config
+
+DEFAULTS = {
+    "habitat": "Various (see description)",
+    "distribution": "Worldwide (varies by species)",
+    "population": "Varies",
+    "characteristics": [],
+    "facts": [],
+    "threats": [],
+}
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE animals (
+    id TEXT PRIMARY KEY,
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    name TEXT,
+    scientific_name TEXT,
+    image TEXT,
+    description TEXT,
+    record TEXT NOT NULL
+);
+CREATE INDEX animals_category ON animals (category, position);
+CREATE INDEX animals_scientific ON animals (scientific_name COLLATE NOCASE);
+CREATE TABLE categories (category TEXT PRIMARY KEY, count INTEGER NOT NULL);
+"""
+
+CARD_COLUMNS = ("id", "name", "scientific_name", "image", "description")
+
+# Bump when SCHEMA changes so existing index files are rebuilt.
+SCHEMA_VERSION = 2
+
+
+def normalize(record: dict) -> dict:
+    """A full animal record with omitted fields filled from DEFAULTS."""
+    out = {k: (list(v) if isinstance(v, list) else v) for k, v in DEFAULTS.items()}
+    out.update(record)
+    out.pop("id", None)
+    return out
+
+
+def _source_signature(path: str) -> str:
+    st = os.stat(path)
+    return f"{SCHEMA_VERSION}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def build_index(source: str, out_path: str) -> int:
+    """Pack the JSONL source into a SQLite index (replaced atomically)."""
+    directory = os.path.dirname(out_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    signature = _source_signature(source)
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript(SCHEMA)
+    count = 0
+    with open(source, encoding="utf-8") as f:
+        for position, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            raw = json.loads(line)
+            record = normalize(raw)
+            conn.execute(
+                "INSERT OR REPLACE INTO animals "
+                "(id, category, position, name, scientific_name, image, description, record) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (raw["id"], record.get("category", ""), position, record.get("name"),
+                 record.get("scientific_name"), record.get("image"),
+                 record.get("description"), json.dumps(raw, ensure_ascii=False)),
+            )
+            count += 1
+    conn.execute(
+        "INSERT INTO categories (category, count) "
+        "SELECT category, COUNT(*) FROM animals GROUP BY category"
+    )
+    conn.execute("INSERT INTO meta (key, value) VALUES ('source', ?)", (signature,))
+    conn.commit()
+    conn.close()
+    os.replace(tmp_path, out_path)
+    return count
+
+
+class AnimalStore:
+    def __init__(self, source: str, index_path: str):
+        self._source = source
+        self._index_path = index_path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._ready = False
+        self._counts = None
+        self._generation = 0
+
+    # -----------------------------
+    # Index lifecycle
+    # -----------------------------
+    def _index_is_current(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        try:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+            finally:
+                conn.close()
+        except sqlite3.DatabaseError:
+            return False
+        return row is not None and row[0] == _source_signature(self._source)
+
+    def _ensure_index(self) -> None:
+        if self._ready:
+            return
+        with self._lock:
+            if self._ready:
+                return
+            if not self._index_is_current(self._index_path):
+                try:
+                    build_index(self._source, self._index_path)
+                except OSError:
+                    # Read-only deployment: keep the index in the temp dir instead.
+                    self._index_path = os.path.join(
+                        tempfile.gettempdir(), os.path.basename(self._index_path)
+                    )
+                    if not self._index_is_current(self._index_path):
+                        build_index(self._source, self._index_path)
+            self._generation += 1
+            self._counts = None
+            self._ready = True
+
+    def generation(self) -> int:
+        """Bumped each time the index is (re)opened; lets derived indexes resync."""
+        self._ensure_index()
+        return self._generation
+
+    def refresh(self) -> None:
+        """Re-check the JSONL source on the next access (e.g. after editing it)."""
+        with self._lock:
+            self._ready = False
+
+    def _conn(self) -> sqlite3.Connection:
+        self._ensure_index()
+        cached = getattr(self._local, "conn", None)
+        if cached is not None and cached[0] == self._generation:
+            return cached[1]
+        if cached is not None:
+            cached[1].close()
+        conn = sqlite3.connect(f"file:{self._index_path}?mode=ro", uri=True)
+        self._local.conn = (self._generation, conn)
+        return conn
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def category_counts(self) -> dict:
+        conn = self._conn()
+        if self._counts is None:
+            self._counts = dict(conn.execute("SELECT category, count FROM categories"))
+        return self._counts
+
+    def count(self, category: str = None) -> int:
+        counts = self.category_counts()
+        return counts.get(category, 0) if category is not None else sum(counts.values())
+
+    def cards(self, category: str, offset: int = 0, limit: int = None) -> list:
+        """Card fields (id, name, scientific_name, image, description) in curated order."""
+        rows = self._conn().execute(
+            f"SELECT {', '.join(CARD_COLUMNS)} FROM animals WHERE category = ? "
+            "ORDER BY position LIMIT ? OFFSET ?",
+            (category, -1 if limit is None else limit, offset),
+        )
+        return [dict(zip(CARD_COLUMNS, row)) for row in rows]
+
+    def cards_by_ids(self, ids: list) -> list:
+        """Card fields for the given ids, in that order (unknown ids skipped)."""
+        if not ids:
+            return []
+        placeholders = ", ".join("?" * len(ids))
+        rows = self._conn().execute(
+            f"SELECT {', '.join(CARD_COLUMNS)} FROM animals WHERE id IN ({placeholders})",
+            list(ids),
+        )
+        by_id = {row[0]: dict(zip(CARD_COLUMNS, row)) for row in rows}
+        return [by_id[i] for i in ids if i in by_id]
+
+    def image_urls(self) -> list:
+        return [row[0] for row in self._conn().execute(
+            "SELECT DISTINCT image FROM animals WHERE image IS NOT NULL AND image != ''"
+        )]
+
+    def find_by_scientific_name(self, name: str):
+        """
+        Card for the animal with this scientific name, or for an
+        infraspecific form of it ("Mustela putorius" -> "Mustela putorius furo").
+        """
+        if not name:
+            return None
+        # Only species-level names extend to infraspecific forms; a bare
+        # genus must not match every species in it.
+        escaped = name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        pattern = escaped + " %" if " " in name.strip() else escaped
+        row = self._conn().execute(
+            f"SELECT {', '.join(CARD_COLUMNS)} FROM animals "
+            "WHERE scientific_name = ? COLLATE NOCASE OR scientific_name LIKE ? ESCAPE '\\' "
+            "ORDER BY scientific_name = ? COLLATE NOCASE DESC, position LIMIT 1",
+            (name, pattern, name),
+        ).fetchone()
+        return dict(zip(CARD_COLUMNS, row)) if row is not None else None
+
+    def ids(self, category: str = None) -> list:
+        if category is None:
+            rows = self._conn().execute("SELECT id FROM animals ORDER BY position")
+        else:
+            rows = self._conn().execute(
+                "SELECT id FROM animals WHERE category = ? ORDER BY position", (category,)
+            )
+        return [row[0] for row in rows]
+
+    def get(self, animal_id: str):
+        row = self._conn().execute(
+            "SELECT record FROM animals WHERE id = ?", (animal_id,)
+        ).fetchone()
+        return normalize(json.loads(row[0])) if row is not None else None
+
+    def iter_records(self, category: str = None):
+        """Yield (id, record) pairs, decoding one row at a time."""
+        sql = "SELECT id, record FROM animals"
+        args = ()
+        if category is not None:
+            sql += " WHERE category = ?"
+            args = (category,)
+        for animal_id, record in self._conn().execute(sql + " ORDER BY position", args):
+            yield animal_id, normalize(json.loads(record))
+
+
+FEATURED_STORE = AnimalStore(config.FEATURED_DATA_PATH, config.FEATURED_INDEX_PATH)
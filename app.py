@@ -1,31 +1,39 @@
-import os
-import uuid
+import time
+import queue
+import threading
 import base64
-from datetime import datetime
+import hashlib
 
 import streamlit as st
 from PIL import Image
-import requests
-
-from openai import OpenAI
 
 import config
+import cloud_client
+import gbif_cache
+import gbif_client
+import gbif_suggest
+import image_cache
+import image_hash
+import image_prep
+import label_taxa
+import offline_model
+import oss_store
+import rate_limit
+import resilience
+import result_cache
+import singleflight
 from animal_data import (
     ANIMAL_CATEGORIES,
     ANIMALS_DATA,
-    get_animals_by_category,
-    get_animal_detail
+    count_animals_by_category,
+    get_animal_cards,
+    find_featured_by_scientific_name,
+    get_animal_detail,
+    get_image_urls,
+    search_animals
 )
 
-# -----------------------------
-# Optional OSS import
-# -----------------------------
-OSS_AVAILABLE = True
-try:
-    import alibabacloud_oss_v2 as oss
-    from alibabacloud_oss_v2.models import PutObjectRequest
-except Exception:
-    OSS_AVAILABLE = False
+OSS_AVAILABLE = oss_store.OSS_AVAILABLE
 
 
 # -----------------------------
@@ -48,9 +56,13 @@ def allowed_file(filename: str) -> bool:
     return ext in config.ALLOWED_EXTENSIONS
 
 
+def bytes_to_data_url(raw: bytes, mime: str) -> str:
+    b64 = base64.b64encode(raw).decode("utf-8")
+    return f"data:{mime};base64,{b64}"
+
+
 def read_image_as_data_url(uploaded_file) -> str:
     raw = uploaded_file.getvalue()
-    b64 = base64.b64encode(raw).decode("utf-8")
 
     ext = uploaded_file.name.rsplit(".", 1)[1].lower() if "." in uploaded_file.name else "jpeg"
     mime = {
@@ -62,62 +74,18 @@ def read_image_as_data_url(uploaded_file) -> str:
         "bmp": "image/bmp",
     }.get(ext, "image/jpeg")
 
-    return f"data:{mime};base64,{b64}"
+    return bytes_to_data_url(raw, mime)
 
 
 # -----------------------------
 # OSS helpers (optional)
 # -----------------------------
 def oss_is_configured() -> bool:
-    if not OSS_AVAILABLE:
-        return False
-
-    required = [
-        config.OSS_ACCESS_KEY_ID,
-        config.OSS_ACCESS_KEY_SECRET,
-        config.OSS_REGION,
-        config.OSS_ENDPOINT,
-        config.OSS_BUCKET,
-    ]
-    return all(bool(x) for x in required)
+    return oss_store.is_configured()
 
 
 def upload_to_oss_bytes(file_bytes: bytes, object_name: str) -> dict:
-    if not OSS_AVAILABLE:
-        return {"success": False, "error": "OSS library not available."}
-
-    try:
-        cfg = oss.config.load_default()
-        cfg.credentials_provider = oss.credentials.StaticCredentialsProvider(
-            access_key_id=config.OSS_ACCESS_KEY_ID,
-            access_key_secret=config.OSS_ACCESS_KEY_SECRET
-        )
-        cfg.region = config.OSS_REGION
-        cfg.endpoint = config.OSS_ENDPOINT
-
-        client = oss.Client(cfg)
-
-        os.makedirs(config.UPLOAD_FOLDER, exist_ok=True)
-        tmp_name = f"{uuid.uuid4().hex}.bin"
-        tmp_path = os.path.join(config.UPLOAD_FOLDER, tmp_name)
-
-        with open(tmp_path, "wb") as f:
-            f.write(file_bytes)
-
-        result = client.put_object_from_file(
-            PutObjectRequest(bucket=config.OSS_BUCKET, key=object_name),
-            tmp_path
-        )
-
-        try:
-            os.remove(tmp_path)
-        except OSError:
-            pass
-
-        file_url = f"https://{config.OSS_BUCKET}.{config.OSS_ENDPOINT}/{object_name}"
-        return {"success": True, "url": file_url, "etag": getattr(result, "etag", None)}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+    return oss_store.upload_bytes(file_bytes, object_name)
 
 
 # -----------------------------
@@ -153,168 +121,380 @@ def get_dashscope_api_key() -> str:
     return ""
 
 
-def build_openai_client():
-    key = get_dashscope_api_key()
-    if not key:
-        return None
+def resolve_api_key(api_key: str = None) -> str:
+    # Worker threads have no session state, so they pass the key in.
+    return api_key if api_key is not None else get_dashscope_api_key()
 
-    return OpenAI(
-        api_key=key,
-        base_url=config.DASHSCOPE_BASE_URL,
-    )
 
+def lease_openai_client(api_key: str):
+    """Context manager yielding the pooled client for api_key."""
+    return cloud_client.CLIENT_POOL.lease(api_key, config.DASHSCOPE_BASE_URL)
 
-# -----------------------------
-# Offline fallback (optional)
-# -----------------------------
-def identify_animal_local(pil_image: Image.Image) -> str:
+
+def release_replaced_sidebar_client(key: str, source: str) -> None:
     """
-    No-key fallback using ImageNet classification.
-    Works only if torch/torchvision are installed (local mode).
-    Will not crash the app if not available.
+    A sidebar key belongs to one user; when it changes or is cleared,
+    close the pooled client (and its connections) for the old key.
     """
-    try:
-        import torch
-        from torchvision import models
+    current = key if source == "sidebar" else ""
+    previous = st.session_state.get("pooled_sidebar_key", "")
+    if previous and previous != current:
+        cloud_client.CLIENT_POOL.discard(previous, config.DASHSCOPE_BASE_URL)
+    st.session_state["pooled_sidebar_key"] = current
 
-        weights = models.MobileNet_V3_Large_Weights.DEFAULT
-        model = models.mobilenet_v3_large(weights=weights)
-        model.eval()
-        preprocess = weights.transforms()
-        categories = weights.meta.get("categories", [])
 
-        img = pil_image.convert("RGB")
-        batch = preprocess(img).unsqueeze(0)
-
-        with torch.no_grad():
-            logits = model(batch)
-            probs = torch.softmax(logits, dim=1)[0]
+# -----------------------------
+# Offline fallback (optional)
+# -----------------------------
+# The label table's build stamp is part of the version, so rebuilding it
+# invalidates cached offline results.
+OFFLINE_RESULT_VERSION = f"v2:{label_taxa.LABEL_TAXA.version()}"
+
+OFFLINE_UNAVAILABLE_TEXT = (
+    "Offline no-key identification is not available on this deployment.\n\n"
+    "This is expected on Streamlit Cloud.\n"
+    "For stronger no-key results, run locally with:\n"
+    "`pip install -r requirements-local.txt`"
+)
 
-        topk = torch.topk(probs, k=5)
 
-        preds = []
-        for score, idx in zip(topk.values.tolist(), topk.indices.tolist()):
-            label = categories[idx] if idx < len(categories) else f"class_{idx}"
-            preds.append((label, score))
+def _identify_animal_local(pil_image: Image.Image) -> str:
+    """Like identify_animal_local, but raises if the offline model is unavailable."""
+    preds = offline_model.classify(pil_image, k=5)
 
-        # Helpful mustelid interpretation (for ferret-like cases)
-        mustelid_keywords = {"weasel", "polecat", "mink", "otter", "stoat", "ermine"}
-        top_labels = [p[0].lower() for p in preds]
-        mustelid_hit = any(any(k in lab for k in mustelid_keywords) for lab in top_labels)
+    # Helpful mustelid interpretation (for ferret-like cases)
+    mustelid_keywords = {"weasel", "polecat", "mink", "otter", "stoat", "ermine"}
+    top_labels = [p[0].lower() for p in preds]
+    mustelid_hit = any(any(k in lab for k in mustelid_keywords) for lab in top_labels)
 
-        lines = []
-        lines.append("**Offline no-key result (best effort):**")
-        lines.append("")
-        for label, score in preds:
-            pct = round(score * 100, 1)
-            lines.append(f"- {label} — {pct}%")
-
-        if mustelid_hit:
-            lines.append("")
-            lines.append(
-                "**Interpretation:** The model suggests a *mustelid-type animal* "
-                "(weasel/polecat/mink/otter). "
-                "If your pet is small, elongated, and domesticated, "
-                "**it could very likely be a ferret**."
+    # Taxa come from the prebuilt label table; no network calls here.
+    annotated = [
+        (label, score, label_taxa.LABEL_TAXA.lookup(index)) for label, score, index in preds
+    ]
+    hidden = 0
+    if config.OFFLINE_ANIMALS_ONLY and label_taxa.LABEL_TAXA.available():
+        animals = [p for p in annotated if p[2] and p[2].get("kingdom") == "Animalia"]
+        if animals:
+            hidden = len(annotated) - len(animals)
+            annotated = animals
+
+    lines = []
+    lines.append("**Offline no-key result (best effort):**")
+    lines.append("")
+    for label, score, taxon in annotated:
+        pct = round(score * 100, 1)
+        line = f"- {label} — {pct}%"
+        if taxon and taxon.get("key"):
+            line += (
+                f" · [*{taxon['canonicalName']}*](https://www.gbif.org/species/{taxon['key']})"
+                f" ({(taxon.get('rank') or '').lower()})"
             )
+            featured = find_featured_by_scientific_name(taxon.get("canonicalName"))
+            if featured:
+                line += f" · in Featured Animals: **{featured['name']}**"
+        lines.append(line)
+    if hidden:
+        lines.append("")
+        lines.append(f"_{hidden} non-animal label(s) hidden._")
 
+    if mustelid_hit:
         lines.append("")
         lines.append(
-            "**Note:** This offline classifier is general-purpose. "
-            "Species-level accuracy is limited compared with cloud vision models."
+            "**Interpretation:** The model suggests a *mustelid-type animal* "
+            "(weasel/polecat/mink/otter). "
+            "If your pet is small, elongated, and domesticated, "
+            "**it could very likely be a ferret**."
         )
-        return "\n".join(lines)
 
+    lines.append("")
+    lines.append(
+        "**Note:** This offline classifier is general-purpose. "
+        "Species-level accuracy is limited compared with cloud vision models."
+    )
+    return "\n".join(lines)
+
+
+def identify_animal_local(pil_image: Image.Image) -> str:
+    """
+    No-key fallback using ImageNet classification.
+    Works only if torch/torchvision are installed (local mode).
+    Will not crash the app if not available.
+    """
+    try:
+        return _identify_animal_local(pil_image)
     except Exception:
-        return (
-            "Offline no-key identification is not available on this deployment.\n\n"
-            "This is expected on Streamlit Cloud.\n"
-            "For stronger no-key results, run locally with:\n"
-            "`pip install -r requirements-local.txt`"
-        )
+        return OFFLINE_UNAVAILABLE_TEXT
 
 
 # -----------------------------
 # Cloud vision (ambiguity-aware)
 # -----------------------------
-def identify_animal_cloud(image_url: str) -> str:
-    client = build_openai_client()
-    if client is None:
+# Bump IDENTIFY_PROMPT_VERSION whenever the prompt changes,
+# so cached results from the old prompt are not reused.
+IDENTIFY_PROMPT_VERSION = "v1"
+
+IDENTIFY_PROMPT = (
+    "You are an expert wildlife identifier.\n"
+    "Carefully analyze the image.\n\n"
+    "If an animal is present, produce an ambiguity-aware identification.\n"
+    "Return the following format in English:\n\n"
+    "Top candidates:\n"
+    "1) <Common name> (<scientific name if possible>) — <confidence %>\n"
+    "2) <Common name> (<scientific name if possible>) — <confidence %>\n"
+    "3) <Common name> (<scientific name if possible>) — <confidence %>\n\n"
+    "Rules:\n"
+    "- Confidence values should be reasonable and sum to about 100%.\n"
+    "- If the animal is very clear, you may provide 1 dominant candidate and 1 minor alternative.\n"
+    "- Explicitly handle common look-alike groups:\n"
+    "  octopus/squid/cuttlefish, sea otter/river otter,\n"
+    "  raccoon/red panda, sea lion/seal/walrus.\n\n"
+    "Then provide:\n"
+    "• Key visual cues used\n"
+    "• Short natural history notes (habitat, behavior)\n"
+    "• One interesting fact\n\n"
+    "If no animal is present, briefly describe the main content."
+)
+
+
+def build_identify_messages(image_url: str) -> list:
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "image_url", "image_url": {"url": image_url}},
+                {"type": "text", "text": IDENTIFY_PROMPT},
+            ],
+        }
+    ]
+
+
+def identify_animal_cloud(
+    image_url: str,
+    api_key: str = None,
+    priority: int = rate_limit.PRIORITY_INTERACTIVE,
+) -> str:
+    key = resolve_api_key(api_key)
+    if not key:
         return ""
 
-    prompt = (
-        "You are an expert wildlife identifier.\n"
-        "Carefully analyze the image.\n\n"
-        "If an animal is present, produce an ambiguity-aware identification.\n"
-        "Return the following format in English:\n\n"
-        "Top candidates:\n"
-        "1) <Common name> (<scientific name if possible>) — <confidence %>\n"
-        "2) <Common name> (<scientific name if possible>) — <confidence %>\n"
-        "3) <Common name> (<scientific name if possible>) — <confidence %>\n\n"
-        "Rules:\n"
-        "- Confidence values should be reasonable and sum to about 100%.\n"
-        "- If the animal is very clear, you may provide 1 dominant candidate and 1 minor alternative.\n"
-        "- Explicitly handle common look-alike groups:\n"
-        "  octopus/squid/cuttlefish, sea otter/river otter,\n"
-        "  raccoon/red panda, sea lion/seal/walrus.\n\n"
-        "Then provide:\n"
-        "• Key visual cues used\n"
-        "• Short natural history notes (habitat, behavior)\n"
-        "• One interesting fact\n\n"
-        "If no animal is present, briefly describe the main content."
+    return singleflight.CLOUD_FLIGHTS.do(
+        cloud_flight_key(key, image_url),
+        lambda: _complete_identification(key, image_url, priority),
     )
 
-    completion = client.chat.completions.create(
-        model=config.QWEN_MODEL,
-        messages=[
-            {
-                "role": "user",
-                "content": [
-                    {"type": "image_url", "image_url": {"url": image_url}},
-                    {"type": "text", "text": prompt},
-                ],
-            }
-        ],
-    )
+
+def cloud_flight_key(api_key: str, image_url: str) -> str:
+    """
+    Sessions sending the same image with the same key at the same time
+    share one call, streamed or not (the key is included so one bad key
+    can't fail others).
+    """
+    return hashlib.sha256(
+        f"{api_key}\0{config.QWEN_MODEL}\0{IDENTIFY_PROMPT_VERSION}\0{image_url}".encode("utf-8")
+    ).hexdigest()
+
+
+def _complete_identification(api_key: str, image_url: str, priority: int) -> str:
+    estimated = config.CLOUD_EST_TOKENS_PER_CALL
+    with lease_openai_client(api_key) as client:
+        completion = rate_limit.call_scheduled(
+            lambda: client.chat.completions.create(
+                model=config.QWEN_MODEL,
+                messages=build_identify_messages(image_url),
+            ),
+            is_retryable=cloud_client.is_service_failure,
+            priority=priority,
+            tokens=estimated,
+        )
+
+    usage = getattr(completion, "usage", None)
+    if usage is not None and getattr(usage, "total_tokens", None):
+        rate_limit.CLOUD_SCHEDULER.record_usage(estimated, usage.total_tokens)
 
     return completion.choices[0].message.content
 
 
-def identify_animal(image_url: str, pil_image: Image.Image) -> str:
+def identify_animal_cloud_stream(image_url: str, timings: dict = None, api_key: str = None):
+    """
+    Streaming variant of identify_animal_cloud: yields text chunks as they
+    arrive. If given, `timings` receives first_token_seconds and total_seconds.
+    """
+    timings = timings if timings is not None else {}
+    key = resolve_api_key(api_key)
+    if not key:
+        return
+
+    started = time.perf_counter()
+    estimated = config.CLOUD_EST_TOKENS_PER_CALL
+    with lease_openai_client(key) as client:
+        # Only opening the stream is retried; a failure mid-stream is final.
+        stream = rate_limit.call_scheduled(
+            lambda: client.chat.completions.create(
+                model=config.QWEN_MODEL,
+                messages=build_identify_messages(image_url),
+                stream=True,
+                # The last chunk then carries the real token count for the budget.
+                stream_options={"include_usage": True},
+            ),
+            is_retryable=cloud_client.is_service_failure,
+            tokens=estimated,
+        )
+        try:
+            for chunk in stream:
+                usage = getattr(chunk, "usage", None)
+                if usage is not None and getattr(usage, "total_tokens", None):
+                    rate_limit.CLOUD_SCHEDULER.record_usage(estimated, usage.total_tokens)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    timings.setdefault("first_token_seconds", time.perf_counter() - started)
+                    yield delta
+        finally:
+            stream.close()
+            timings["total_seconds"] = time.perf_counter() - started
+
+
+class CloudStreamAbandoned(Exception):
+    """The streaming session stopped reading (another result won)."""
+
+
+def identify_animal_cloud_guarded(
+    image_url: str,
+    api_key: str,
+    priority: int = rate_limit.PRIORITY_INTERACTIVE,
+) -> str:
+    """identify_animal_cloud that reports its outcome to the circuit breaker."""
+    recorded = False
+    try:
+        text = identify_animal_cloud(image_url, api_key=api_key, priority=priority)
+        resilience.CLOUD_BREAKER.record_success()
+        recorded = True
+        return text
+    except (rate_limit.RateLimitQueueFull, rate_limit.RateLimitTimeout, CloudStreamAbandoned):
+        # Local back-pressure (or a coalesced stream that was abandoned)
+        # says nothing about the service's health.
+        raise
+    except Exception as e:
+        resilience.CLOUD_BREAKER.record_error(cloud_client.is_service_failure(e))
+        recorded = True
+        raise
+    finally:
+        if not recorded:
+            resilience.CLOUD_BREAKER.release_trial()
+
+
+def prefetch_cloud_result(image_url: str, api_key: str, cache_key: str) -> None:
+    """
+    Runs on HEDGE_EXECUTOR after the local model answered an upload that
+    prefers the cloud: fetch the cloud answer at batch priority (queued
+    behind interactive uploads) and cache it, so the next run shows it.
+    Joins the hedged cloud call if that is still in flight.
+    """
+    for _ in range(2):
+        if not resilience.CLOUD_BREAKER.allow():
+            return
+        try:
+            text = identify_animal_cloud_guarded(
+                image_url, api_key, priority=rate_limit.PRIORITY_BATCH
+            )
+        except CloudStreamAbandoned:
+            continue  # joined a stream that was dropped; make our own call
+        except Exception:
+            return
+        if text:
+            result_cache.RESULT_CACHE.put(cache_key, text)
+        return
+
+
+def identify_animal_with_source(image_url: str, pil_image: Image.Image, try_cloud: bool = True):
     """
     Robust two-level strategy:
     - If cloud key works -> cloud result
     - Otherwise -> offline attempt
+
+    With CLOUD_HEDGE_MODE "hedge" the offline model starts speculatively once
+    the cloud call passes CLOUD_HEDGE_BUDGET_SECONDS ("race" starts both at
+    once), and the first usable result wins, cloud first on ties. The cloud
+    is skipped while the circuit breaker is open.
+
+    Returns (text, source) where source is "cloud", "local",
+    or None when neither produced a real identification.
     """
+    api_key = get_dashscope_api_key() if try_cloud else ""
+    if api_key and resilience.CLOUD_BREAKER.allow():
+        mode = config.CLOUD_HEDGE_MODE
+        if mode in ("hedge", "race"):
+            budget = 0 if mode == "race" else config.CLOUD_HEDGE_BUDGET_SECONDS
+            source, text = resilience.run_hedged(
+                [
+                    ("cloud", lambda: identify_animal_cloud_guarded(image_url, api_key)),
+                    ("local", lambda: _identify_animal_local(pil_image)),
+                ],
+                budget_seconds=budget,
+            )
+            if source:
+                return text, source
+            return OFFLINE_UNAVAILABLE_TEXT, None
+
+        try:
+            text = identify_animal_cloud_guarded(image_url, api_key)
+            if text:
+                return text, "cloud"
+        except Exception:
+            pass
+
     try:
-        text = identify_animal_cloud(image_url)
-        if text:
-            return text
+        return _identify_animal_local(pil_image), "local"
     except Exception:
-        pass
+        return OFFLINE_UNAVAILABLE_TEXT, None
+
+
+def identify_animal(image_url: str, pil_image: Image.Image) -> str:
+    text, _ = identify_animal_with_source(image_url, pil_image)
+    return text
+
+
+def find_near_duplicate_result(phash: int, preferred: str):
+    """Reuse a cached result from a perceptually near-identical image, if any."""
+    for distance, keys in image_hash.NEAR_DUP_INDEX.lookup(phash):
+        text = result_cache.RESULT_CACHE.get(keys[preferred])
+        if text is not None:
+            return text, distance
+    return None, None
 
-    return identify_animal_local(pil_image)
+
+def identification_cache_keys(file_bytes: bytes) -> dict:
+    return {
+        "cloud": result_cache.cache_key(file_bytes, config.QWEN_MODEL, IDENTIFY_PROMPT_VERSION),
+        "local": result_cache.cache_key(
+            file_bytes, offline_model.MODEL_NAME, OFFLINE_RESULT_VERSION
+        ),
+    }
 
 
 # -----------------------------
 # Global Encyclopedia (GBIF only)
 # -----------------------------
-@st.cache_data(ttl=60 * 60)
-def gbif_species_search(query: str, limit: int = 20):
-    url = "https://api.gbif.org/v1/species/search"
-    params = {"q": query, "limit": limit}
-    r = requests.get(url, params=params, timeout=15)
-    r.raise_for_status()
-    data = r.json()
-    return data.get("results", [])
+# st.cache_data is the per-process hot layer; gbif_client adds the
+# shared on-disk cache underneath it. Its TTL is kept short so refreshed
+# (stale-while-revalidate) entries show up soon after GBIF changes.
+@st.cache_data(ttl=config.GBIF_MEMORY_TTL_SECONDS)
+def gbif_species_search_page(
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    rank: str = None,
+    higher_taxon_key: int = None,
+):
+    return gbif_client.species_search_page(
+        query, limit=limit, offset=offset, rank=rank, higher_taxon_key=higher_taxon_key
+    )
 
 
-@st.cache_data(ttl=60 * 60)
+@st.cache_data(ttl=config.GBIF_MEMORY_TTL_SECONDS)
 def gbif_species_detail(key: int):
-    url = f"https://api.gbif.org/v1/species/{key}"
-    r = requests.get(url, timeout=15)
-    r.raise_for_status()
-    return r.json()
+    return gbif_client.species_detail(key)
 
 
 # -----------------------------
@@ -345,16 +525,80 @@ This app includes three parts:
         st.metric("Image upload", "Up to 16 MB")
 
 
+# -----------------------------
+# UI: Pagination
+# -----------------------------
+# Only the visible page is built on each run. st.fragment (or the
+# experimental one on older Streamlit) lets paging and in-list buttons
+# rerun just the list instead of the whole page.
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda fn: fn)
+
+
+def shift_page(state_key: str, delta: int):
+    st.session_state[state_key] = max(0, st.session_state.get(state_key, 0) + delta)
+
+
+def render_pager(state_key: str, page: int, has_next: bool, page_count: int = None, on_shift=None):
+    """
+    Previous / Next buttons plus a page label; the cursor lives in
+    st.session_state[state_key]. on_shift(state_key, delta) replaces
+    shift_page for both buttons.
+    """
+    on_shift = on_shift or shift_page
+    c1, c2, c3 = st.columns([1, 2, 1])
+    with c1:
+        st.button(
+            "← Previous", key=f"{state_key}_prev", disabled=page == 0,
+            on_click=on_shift, args=(state_key, -1),
+        )
+    with c2:
+        label = f"Page {page + 1}" + (f" of {page_count}" if page_count else "")
+        st.caption(label)
+    with c3:
+        st.button(
+            "Next →", key=f"{state_key}_next", disabled=not has_next,
+            on_click=on_shift, args=(state_key, 1),
+        )
+
+
 # -----------------------------
 # UI: Featured Categories
 # -----------------------------
+def render_featured_search():
+    query = st.text_input(
+        "Search featured animals",
+        key="featured_query",
+        placeholder="Name, scientific name, habitat, facts... (typos are fine)",
+    )
+    if not query.strip():
+        return
+
+    results = search_animals(query, limit=10)
+    if not results:
+        st.info("No featured animals match. Try the Global Encyclopedia for GBIF records.")
+        return
+
+    for animal in results:
+        c1, c2 = st.columns([4, 1])
+        with c1:
+            st.markdown(f"**{animal.get('name', animal['id'])}**")
+            if animal.get("scientific_name"):
+                st.caption(animal["scientific_name"])
+        with c2:
+            if st.button("View details", key=f"search_detail_{animal['id']}"):
+                st.session_state["page"] = "featured_animal"
+                st.session_state["animal_id"] = animal["id"]
+    st.markdown("---")
+
+
 def render_featured_categories():
     st.title("🗂️ Featured Animal Categories")
+    render_featured_search()
 
     cols = st.columns(3)
     i = 0
     for cat_id, info in ANIMAL_CATEGORIES.items():
-        featured_count = len(get_animals_by_category(cat_id))
+        featured_count = count_animals_by_category(cat_id)
 
         with cols[i % 3]:
             st.markdown(f"### {info.get('name', cat_id.title())}")
@@ -374,25 +618,38 @@ def render_featured_category_detail(category_id: str):
         return
 
     info = ANIMAL_CATEGORIES[category_id]
-    animals = get_animals_by_category(category_id)
 
     st.title(f"📌 {info.get('name', category_id.title())}")
     st.caption(info.get("description", ""))
 
-    if not animals:
+    total = count_animals_by_category(category_id)
+    if not total:
         st.info("No featured animals in this category yet.")
         return
 
+    if st.session_state.get("featured_page_category") != category_id:
+        st.session_state["featured_page_category"] = category_id
+        st.session_state["featured_page"] = 0
+
     st.markdown("### Featured animals")
-    animal_items = list(animals.items())
-    cols = st.columns(3)
+    render_featured_grid(category_id, total)
 
-    for idx, (animal_id, animal) in enumerate(animal_items):
+
+@fragment
+def render_featured_grid(category_id: str, total: int):
+    page_size = config.FEATURED_PAGE_SIZE
+    page_count = (total + page_size - 1) // page_size
+    page = min(st.session_state.get("featured_page", 0), page_count - 1)
+    animals = get_animal_cards(category_id, offset=page * page_size, limit=page_size)
+
+    cols = st.columns(3)
+    for idx, animal in enumerate(animals):
+        animal_id = animal["id"]
         with cols[idx % 3]:
             st.markdown(f"#### {animal.get('name', animal_id)}")
             img = animal.get("image")
             if img:
-                st.image(img, use_container_width=True)
+                st.image(image_cache.IMAGE_CACHE.src(img, "thumb"), use_container_width=True)
 
             sci = animal.get("scientific_name", "")
             if sci:
@@ -405,6 +662,10 @@ def render_featured_category_detail(category_id: str):
             if st.button("View details", key=f"feat_detail_{animal_id}"):
                 st.session_state["page"] = "featured_animal"
                 st.session_state["animal_id"] = animal_id
+                st.rerun()
+
+    if page_count > 1:
+        render_pager("featured_page", page, has_next=page + 1 < page_count, page_count=page_count)
 
 
 def render_featured_animal_detail(animal_id: str):
@@ -422,7 +683,7 @@ def render_featured_animal_detail(animal_id: str):
     col1, col2 = st.columns([1, 1], gap="large")
     with col1:
         if animal.get("image"):
-            st.image(animal["image"], use_container_width=True)
+            st.image(image_cache.IMAGE_CACHE.src(animal["image"], "detail"), use_container_width=True)
 
         st.markdown(f"**Category:** {category_info.get('name', animal.get('category', ''))}")
         st.markdown(f"**Conservation status:** {animal.get('conservation_status', 'N/A')}")
@@ -451,6 +712,81 @@ def render_featured_animal_detail(animal_id: str):
 # -----------------------------
 # UI: Global Encyclopedia (GBIF)
 # -----------------------------
+def load_more_gbif_results(from_button: bool = False):
+    """Fetch the next page for the current search into session state."""
+    search = st.session_state["gbif_search"]
+    st.session_state["gbif_load_error"] = ""
+    try:
+        page = gbif_species_search_page(
+            search["query"],
+            limit=search["limit"],
+            offset=st.session_state["gbif_next_offset"],
+            rank=search["rank"],
+            higher_taxon_key=search["higher_taxon_key"],
+        )
+    except Exception as e:
+        # Button callbacks can't surface errors themselves; show them on the next run.
+        if not from_button:
+            raise
+        st.session_state["gbif_load_error"] = str(e)
+        return
+
+    seen = {r.get("key") for r in st.session_state["gbif_results"]}
+    st.session_state["gbif_results"] += [r for r in page["results"] if r.get("key") not in seen]
+    st.session_state["gbif_next_offset"] = page["offset"] + search["limit"]
+    st.session_state["gbif_end"] = page["end_of_records"] or not page["results"]
+
+
+def prefetch_gbif_page(page: int):
+    """Warm the detail cache for the top results on a page so "Load GBIF details" is instant."""
+    gbif_client.cancel_prefetch(st.session_state.get("gbif_prefetch", []))
+    limit = st.session_state["gbif_search"]["limit"]
+    visible = st.session_state["gbif_results"][page * limit:(page + 1) * limit]
+    st.session_state["gbif_prefetch"] = gbif_client.prefetch_details(
+        [r.get("key") for r in visible[:config.GBIF_PREFETCH_TOP_N]]
+    )
+
+
+def shift_gbif_page(state_key: str = "gbif_page", delta: int = 1):
+    """
+    Move by delta pages, fetching the page from GBIF first if it isn't
+    loaded yet, and warm the details of whichever page is shown.
+    """
+    limit = st.session_state["gbif_search"]["limit"]
+    page = max(0, st.session_state.get(state_key, 0) + delta)
+    if len(st.session_state["gbif_results"]) <= page * limit and not st.session_state["gbif_end"]:
+        load_more_gbif_results(from_button=True)
+    if len(st.session_state["gbif_results"]) > page * limit:
+        st.session_state[state_key] = page
+        prefetch_gbif_page(page)
+
+
+def use_gbif_suggestion(name: str):
+    st.session_state["gbif_query"] = name
+
+
+def render_gbif_suggestions(query: str):
+    """Names from the local backbone index; clicking one replaces the query."""
+    try:
+        suggestions = gbif_suggest.SUGGEST_CLIENT.suggest(query, limit=config.GBIF_SUGGEST_LIMIT)
+    except Exception:
+        return
+
+    names = []
+    for s in suggestions:
+        name = s.get("canonicalName") or s.get("scientificName")
+        if name and name.lower() != query.strip().lower() and name not in names:
+            names.append(name)
+    if not names:
+        return
+
+    st.caption("Suggestions")
+    cols = st.columns(min(len(names), 5))
+    for i, name in enumerate(names[:5]):
+        with cols[i]:
+            st.button(name, key=f"suggest_{i}", on_click=use_gbif_suggestion, args=(name,))
+
+
 def render_global_encyclopedia():
     st.title("🌍 Global Animal Encyclopedia (GBIF)")
 
@@ -460,68 +796,266 @@ def render_global_encyclopedia():
 
     query = st.text_input(
         "Search by common name or scientific name",
-        placeholder="e.g., ferret, Mustela putorius furo, tiger, Panthera tigris"
+        placeholder="e.g., ferret, Mustela putorius furo, tiger, Panthera tigris",
+        key="gbif_query"
     )
 
+    if config.GBIF_SUGGEST_ENABLED and query and gbif_suggest.SUGGEST_CLIENT.available():
+        render_gbif_suggestions(query)
+
     col_filters = st.columns([1, 1, 1])
     with col_filters[0]:
-        limit = st.slider("Max results", 5, 50, 20)
+        limit = st.slider("Results per page", 5, 50, 20)
     with col_filters[1]:
         rank_filter = st.selectbox(
             "Rank filter (optional)",
             ["Any", "SPECIES", "GENUS", "FAMILY", "ORDER", "CLASS", "PHYLUM", "KINGDOM"]
         )
     with col_filters[2]:
-        only_animals_hint = st.checkbox("Prefer animals (soft hint)", value=True)
+        only_animals = st.checkbox("Animals only (Animalia)", value=True)
 
     if not query:
         st.info("Type a name to start searching.")
         return
 
-    try:
-        with st.spinner("Searching GBIF..."):
-            results = gbif_species_search(query, limit=limit)
-
-        if only_animals_hint:
-            animalia = [r for r in results if (r.get("kingdom") == "Animalia")]
-            others = [r for r in results if (r.get("kingdom") != "Animalia")]
-            results = animalia + others
+    # Filters are applied by GBIF, so every fetched row is shown.
+    search = {
+        "query": query,
+        "limit": limit,
+        "rank": None if rank_filter == "Any" else rank_filter,
+        "higher_taxon_key": gbif_client.ANIMALIA_KEY if only_animals else None,
+    }
 
-        if rank_filter != "Any":
-            results = [r for r in results if r.get("rank") == rank_filter]
-
-        if not results:
+    try:
+        if st.session_state.get("gbif_search") != search:
+            st.session_state["gbif_search"] = search
+            st.session_state["gbif_results"] = []
+            st.session_state["gbif_next_offset"] = 0
+            st.session_state["gbif_end"] = False
+            st.session_state["gbif_page"] = 0
+            with st.spinner("Searching GBIF..."):
+                load_more_gbif_results()
+            prefetch_gbif_page(0)
+
+        if not st.session_state["gbif_results"]:
             st.warning("No results found. Try a different keyword.")
             return
 
         st.markdown("### Search results")
-
-        for r in results[:limit]:
-            key = r.get("key")
-            canonical = r.get("canonicalName") or r.get("scientificName", "Unknown")
-            rank = r.get("rank", "N/A")
-            kingdom = r.get("kingdom", "N/A")
-            family = r.get("family", "")
-            genus = r.get("genus", "")
-
-            with st.expander(f"{canonical}  •  {rank}  •  {kingdom}", expanded=False):
-                st.write(f"**GBIF key:** {key}")
-                if family:
-                    st.write(f"**Family:** {family}")
-                if genus:
-                    st.write(f"**Genus:** {genus}")
-
-                if st.button("Load GBIF details", key=f"gbif_{key}"):
-                    detail = gbif_species_detail(key)
-                    st.json(detail)
+        render_gbif_results_page()
 
     except Exception as e:
+        # Retry the search on the next rerun instead of showing a stale empty list.
+        st.session_state.pop("gbif_search", None)
         st.error(f"Global search failed: {e}")
 
 
+@fragment
+def render_gbif_results_page():
+    """One page of results; paging and detail buttons rerun only this fragment."""
+    limit = st.session_state["gbif_search"]["limit"]
+    results = st.session_state["gbif_results"]
+    page = st.session_state.get("gbif_page", 0)
+
+    for r in results[page * limit:(page + 1) * limit]:
+        key = r.get("key")
+        canonical = r.get("canonicalName") or r.get("scientificName", "Unknown")
+        rank = r.get("rank", "N/A")
+        kingdom = r.get("kingdom", "N/A")
+        family = r.get("family", "")
+        genus = r.get("genus", "")
+
+        with st.expander(f"{canonical}  •  {rank}  •  {kingdom}", expanded=False):
+            st.write(f"**GBIF key:** {key}")
+            if family:
+                st.write(f"**Family:** {family}")
+            if genus:
+                st.write(f"**Genus:** {genus}")
+
+            if st.button("Load GBIF details", key=f"gbif_{key}"):
+                # Fragment reruns skip render_global_encyclopedia's handler.
+                try:
+                    st.json(gbif_species_detail(key))
+                except Exception as e:
+                    st.error(f"Loading GBIF details failed: {e}")
+
+    has_next = len(results) > (page + 1) * limit or not st.session_state["gbif_end"]
+    render_pager("gbif_page", page, has_next=has_next, on_shift=shift_gbif_page)
+    if st.session_state.get("gbif_load_error"):
+        st.error(f"Loading more results failed: {st.session_state['gbif_load_error']}")
+
+
 # -----------------------------
 # UI: Image Identifier
 # -----------------------------
+def build_image_url(uploaded, file_bytes: bytes) -> str:
+    """
+    Downsize + strip metadata once, then hand the same payload to
+    OSS (preferred, if fully configured) or a base64 data URL.
+    """
+    payload = file_bytes
+    ext = uploaded.name.rsplit(".", 1)[1].lower()
+    mime = None
+
+    if config.IMAGE_PREP_ENABLED:
+        try:
+            prepared = image_prep.prepare_image(file_bytes)
+            payload, ext, mime = prepared["bytes"], prepared["ext"], prepared["mime"]
+            st.caption(
+                f"Optimized upload: {prepared['original_size'] / 1024:.0f} KB → "
+                f"{prepared['size'] / 1024:.0f} KB in {prepared['seconds'] * 1000:.0f} ms."
+            )
+        except Exception:
+            pass
+
+    if oss_is_configured():
+        object_name = oss_store.content_object_name(payload, ext)
+        up = upload_to_oss_bytes(payload, object_name)
+        if up.get("success"):
+            return up["url"]
+
+    if mime:
+        return bytes_to_data_url(payload, mime)
+    return read_image_as_data_url(uploaded)
+
+
+def _pump_cloud_stream(image_url: str, api_key: str, out: queue.Queue, cancel: threading.Event,
+                       timings: dict):
+    """
+    Runs on HEDGE_EXECUTOR: reads the cloud stream into `out` as ("chunk", text)
+    items, then ("done", None) or ("error", exc). Reports the outcome to the
+    circuit breaker; a cancelled or rate-limited call counts as neither.
+
+    Goes through CLOUD_FLIGHTS like identify_animal_cloud: a session that
+    joins an identical call already in flight gets the final text as a
+    single chunk instead of a stream of its own.
+    """
+    if not api_key:
+        out.put(("done", None))
+        return
+
+    leader = []
+
+    def stream_all() -> str:
+        leader.append(True)
+        parts = []
+        chunks = identify_animal_cloud_stream(image_url, timings, api_key=api_key)
+        try:
+            for delta in chunks:
+                if cancel.is_set():
+                    raise CloudStreamAbandoned()
+                parts.append(delta)
+                out.put(("chunk", delta))
+        finally:
+            chunks.close()
+        return "".join(parts)
+
+    recorded = False
+    try:
+        text = singleflight.CLOUD_FLIGHTS.do(cloud_flight_key(api_key, image_url), stream_all)
+        if not leader and text:
+            out.put(("chunk", text))
+        resilience.CLOUD_BREAKER.record_success()
+        recorded = True
+        out.put(("done", None))
+    except (rate_limit.RateLimitQueueFull, rate_limit.RateLimitTimeout, CloudStreamAbandoned) as e:
+        out.put(("error", e))
+    except Exception as e:
+        resilience.CLOUD_BREAKER.record_error(cloud_client.is_service_failure(e))
+        recorded = True
+        out.put(("error", e))
+    finally:
+        if not recorded:
+            resilience.CLOUD_BREAKER.release_trial()
+
+
+def _local_text(future) -> str:
+    try:
+        return future.result()
+    except Exception:
+        return ""
+
+
+def stream_cloud_result(image_url: str, pil_image: Image.Image):
+    """
+    Render cloud output as it arrives. The hedge applies here too: if no
+    first token arrives within CLOUD_HEDGE_BUDGET_SECONDS ("race": at once),
+    the offline model starts, and whichever produces a result first wins.
+
+    Returns (text, source); ("", None) if neither produced one.
+    """
+    api_key = get_dashscope_api_key()
+    items = queue.Queue()
+    cancel = threading.Event()
+    timings = {}
+    resilience.HEDGE_EXECUTOR.submit(_pump_cloud_stream, image_url, api_key, items, cancel, timings)
+
+    mode = config.CLOUD_HEDGE_MODE
+    budget = {"race": 0, "hedge": config.CLOUD_HEDGE_BUDGET_SECONDS}.get(mode)
+    local = None
+    local_failed = cloud_ended = False
+
+    def start_local():
+        future = resilience.FALLBACK_EXECUTOR.submit(_identify_animal_local, pil_image)
+        future.add_done_callback(lambda f: items.put(("local", f)))
+        return future
+
+    try:
+        if budget is not None and budget <= 0:
+            local = start_local()
+
+        # Wait for the first cloud token, the budget, or the local result.
+        while True:
+            try:
+                kind, value = items.get(timeout=budget if local is None else None)
+            except queue.Empty:
+                local = start_local()
+                continue
+
+            if kind == "chunk":
+                first = value
+                break
+            if kind == "local":
+                text = _local_text(value)
+                if text:
+                    return text, "local"
+                local_failed = True
+            else:
+                cloud_ended = True
+            if cloud_ended and (local is None or local_failed):
+                return "", None
+
+        def rest():
+            yield first
+            while True:
+                kind, value = items.get()
+                if kind == "chunk":
+                    yield value
+                elif kind == "error":
+                    raise value
+                elif kind == "done":
+                    return
+
+        # Streamed into a placeholder so a mid-stream failure leaves no
+        # partial answer behind when the fallback result is shown.
+        placeholder = st.empty()
+        try:
+            text = placeholder.write_stream(rest())
+        except Exception:
+            placeholder.empty()
+            return "", None
+    finally:
+        cancel.set()
+
+    if text and "first_token_seconds" in timings:
+        st.caption(
+            f"First token after {timings['first_token_seconds']:.1f} s, "
+            f"complete after {timings['total_seconds']:.1f} s."
+        )
+    text = text if isinstance(text, str) else ""
+    return (text, "cloud") if text else ("", None)
+
+
 def render_identifier():
     st.title("🧠 Image Animal Identifier")
 
@@ -552,23 +1086,52 @@ Upload an image and get an identification.
         st.image(image, caption="Uploaded image", use_container_width=True)
 
         file_bytes = uploaded.getvalue()
-        unique_ext = uploaded.name.rsplit(".", 1)[1].lower()
-        unique_name = f"{uuid.uuid4().hex}.{unique_ext}"
-        timestamp = datetime.now().strftime("%Y%m%d")
-
-        # Prefer OSS URL if fully configured, else base64
-        if oss_is_configured():
-            object_name = f"animal-images/{timestamp}/{unique_name}"
-            up = upload_to_oss_bytes(file_bytes, object_name)
-            image_url = up["url"] if up.get("success") else read_image_as_data_url(uploaded)
-        else:
-            image_url = read_image_as_data_url(uploaded)
 
-        with st.spinner("Identifying..."):
-            result_text = identify_animal(image_url, pil_image=image)
-
-        st.markdown("### Result")
-        st.write(result_text)
+        # Look up the result the current setup would produce (cloud if a key is set).
+        cache_keys = identification_cache_keys(file_bytes)
+        preferred = "cloud" if get_dashscope_api_key() else "local"
+        result_text = result_cache.RESULT_CACHE.get(cache_keys[preferred])
+
+        phash = None
+        if result_text is None and config.NEAR_DUP_ENABLED:
+            phash = image_hash.dhash(image)
+            result_text, distance = find_near_duplicate_result(phash, preferred)
+            if result_text is not None:
+                st.caption(f"Reused the result of a near-identical image (distance {distance}).")
+
+        if result_text is None:
+            image_url = build_image_url(uploaded, file_bytes)
+
+            st.markdown("### Result")
+            streamed = (
+                config.CLOUD_STREAMING
+                and preferred == "cloud"
+                and resilience.CLOUD_BREAKER.allow()
+            )
+            source = None
+            if streamed:
+                result_text, source = stream_cloud_result(image_url, pil_image=image)
+                if source == "local":
+                    st.write(result_text)
+
+            if not result_text:
+                with st.spinner("Identifying..."):
+                    result_text, source = identify_animal_with_source(
+                        image_url, pil_image=image, try_cloud=not streamed
+                    )
+                st.write(result_text)
+
+            if source:
+                result_cache.RESULT_CACHE.put(cache_keys[source], result_text)
+                if phash is not None:
+                    image_hash.NEAR_DUP_INDEX.add(phash, cache_keys)
+            if source == "local" and preferred == "cloud" and config.CLOUD_PREFETCH_AFTER_LOCAL:
+                resilience.HEDGE_EXECUTOR.submit(
+                    prefetch_cloud_result, image_url, get_dashscope_api_key(), cache_keys["cloud"]
+                )
+        else:
+            st.markdown("### Result")
+            st.write(result_text)
 
     except Exception as e:
         st.error(f"Failed to process image: {e}")
@@ -592,6 +1155,7 @@ def render_sidebar_key_box():
 
     key = get_dashscope_api_key()
     source = st.session_state.get("dashscope_key_source", "unknown")
+    release_replaced_sidebar_client(key, source)
 
     if key:
         st.sidebar.success(f"Cloud vision enabled (source: {source}).")
@@ -602,6 +1166,32 @@ def render_sidebar_key_box():
     if not OSS_AVAILABLE:
         st.sidebar.caption("OSS library not detected (image upload will use base64).")
 
+    breaker = resilience.CLOUD_BREAKER.status()
+    if key and breaker["state"] == resilience.BREAKER_OPEN:
+        st.sidebar.warning(
+            f"Cloud vision paused after repeated failures "
+            f"(retrying in {breaker['cooldown_remaining']:.0f} s); using offline mode."
+        )
+
+    with st.sidebar.expander("Performance stats", expanded=False):
+        st.caption(f"Result cache: {result_cache.RESULT_CACHE.stats()}")
+        st.caption(f"GBIF cache: {gbif_cache.GBIF_CACHE.stats()}")
+        st.caption(
+            "Coalesced calls: "
+            f"GBIF {singleflight.GBIF_FLIGHTS.stats()}, "
+            f"cloud {singleflight.CLOUD_FLIGHTS.stats()}"
+        )
+        st.caption(f"Featured images: {image_cache.IMAGE_CACHE.stats()}")
+
+    status = offline_model.model_status()
+    if status["state"] == offline_model.STATE_READY:
+        st.sidebar.caption(
+            f"Offline model warm ({status['engine']} engine, "
+            f"loaded in {status['load_seconds']:.1f} s)."
+        )
+    elif status["state"] == offline_model.STATE_LOADING:
+        st.sidebar.caption("Offline model warming up...")
+
 
 # -----------------------------
 # State + navigation
@@ -631,6 +1221,8 @@ def sidebar_nav():
 
 
 def main():
+    offline_model.start_warmup()
+    image_cache.start(get_image_urls())
     ensure_state()
     sidebar_nav()
     render_sidebar_key_box()
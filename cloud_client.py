@@ -0,0 +1,161 @@
+# Pooled OpenAI-compatible clients for DashScope
+# One client (and one keep-alive HTTP connection pool) per
+# (API key, base URL), shared by every session using that key, so
+# back-to-back identifications reuse warm TLS connections.
+#
+# Clients are leased: one evicted or discarded while a request is still
+# using it is closed only when the last lease ends, never mid-request.
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import httpx
+import openai
+from openai import OpenAI
+
+import config
+
+
+def _pool_key(api_key: str, base_url: str) -> tuple:
+    # Don't keep raw keys around as dict keys.
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest(), base_url
+
+
+class ClientPool:
+    def __init__(self, max_clients: int = 16, idle_seconds: float = 1800):
+        self._lock = threading.Lock()
+        self._clients = OrderedDict()  # key -> [client, last_used, users]
+        self._retired = {}  # id(client) -> entry, evicted while still in use
+        self._max_clients = max(1, max_clients)
+        self._idle_seconds = idle_seconds
+        self._created = 0
+        self._reused = 0
+
+    def _build(self, api_key: str, base_url: str) -> OpenAI:
+        http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=config.CLOUD_MAX_CONNECTIONS,
+                max_keepalive_connections=config.CLOUD_MAX_KEEPALIVE,
+                keepalive_expiry=config.CLOUD_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                config.CLOUD_READ_TIMEOUT, connect=config.CLOUD_CONNECT_TIMEOUT
+            ),
+        )
+        return OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            http_client=http_client,
+            max_retries=config.CLOUD_MAX_RETRIES,
+        )
+
+    def acquire(self, api_key: str, base_url: str) -> OpenAI:
+        """The pooled client for this key; hand it back with release() when done."""
+        key = _pool_key(api_key, base_url)
+        now = time.monotonic()
+        stale = []
+
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                entry[1] = now
+                self._clients.move_to_end(key)
+                self._reused += 1
+            else:
+                entry = [self._build(api_key, base_url), now, 0]
+                self._clients[key] = entry
+                self._created += 1
+            entry[2] += 1
+            client = entry[0]
+
+            for k, e in list(self._clients.items()):
+                if k != key and e[2] == 0 and now - e[1] > self._idle_seconds:
+                    stale.append(self._retire(k))
+            while len(self._clients) > self._max_clients:
+                stale.append(self._retire(next(iter(self._clients))))
+
+        for c in stale:
+            if c is not None:
+                _close_quietly(c)
+        return client
+
+    def release(self, client: OpenAI) -> None:
+        """Return a client from acquire(); a retired client closes with its last user."""
+        with self._lock:
+            for entry in self._clients.values():
+                if entry[0] is client:
+                    entry[2] -= 1
+                    return
+            retired = self._retired.get(id(client))
+            if retired is None:
+                return
+            retired[2] -= 1
+            if retired[2] > 0:
+                return
+            del self._retired[id(client)]
+        _close_quietly(client)
+
+    @contextmanager
+    def lease(self, api_key: str, base_url: str):
+        client = self.acquire(api_key, base_url)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def _retire(self, key):
+        """
+        Drop a client from the pool (caller holds the lock). Returns it if it
+        can be closed now; a client still in use is closed on its last release.
+        """
+        entry = self._clients.pop(key)
+        if entry[2] == 0:
+            return entry[0]
+        self._retired[id(entry[0])] = entry
+        return None
+
+    def discard(self, api_key: str, base_url: str) -> None:
+        """Forget the client for a key that is no longer in use (closed once idle)."""
+        with self._lock:
+            key = _pool_key(api_key, base_url)
+            client = self._retire(key) if key in self._clients else None
+        if client is not None:
+            _close_quietly(client)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "retired": len(self._retired),
+                "created": self._created,
+                "reused": self._reused,
+            }
+
+
+def is_service_failure(exc: Exception) -> bool:
+    """
+    True for errors that say the service is unhealthy (timeouts, connection
+    errors, 429, 5xx). Bad keys or bad requests are the caller's problem
+    and must not trip the circuit breaker for everyone else.
+    """
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code >= 500
+    return isinstance(exc, (httpx.TimeoutException, httpx.NetworkError))
+
+
+def _close_quietly(client: OpenAI) -> None:
+    try:
+        client.close()
+    except Exception:
+        pass
+
+
+CLIENT_POOL = ClientPool(
+    max_clients=config.CLOUD_CLIENT_POOL_SIZE,
+    idle_seconds=config.CLOUD_CLIENT_IDLE_SECONDS,
+)
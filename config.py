@@ -26,3 +26,175 @@ UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "temp_uploads")
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "bmp", "webp"}
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024
 
+
+# -----------------------------
+# Offline model (optional, local mode)
+# -----------------------------
+OFFLINE_MODEL_WARMUP = os.getenv("OFFLINE_MODEL_WARMUP", "1") == "1"
+OFFLINE_MODEL_DIR = os.getenv("OFFLINE_MODEL_DIR", "model_cache")
+# auto | onnx | quantized | torch
+OFFLINE_ENGINE = os.getenv("OFFLINE_ENGINE", "auto")
+OFFLINE_ONNX_INT8 = os.getenv("OFFLINE_ONNX_INT8", "0") == "1"
+OFFLINE_INTRA_OP_THREADS = int(os.getenv("OFFLINE_INTRA_OP_THREADS", "0"))
+OFFLINE_ENGINE_TOLERANCE = float(os.getenv("OFFLINE_ENGINE_TOLERANCE", "0.02"))
+OFFLINE_BATCHING = os.getenv("OFFLINE_BATCHING", "1") == "1"
+OFFLINE_BATCH_MAX_SIZE = int(os.getenv("OFFLINE_BATCH_MAX_SIZE", "8"))
+OFFLINE_BATCH_MAX_WAIT_MS = float(os.getenv("OFFLINE_BATCH_MAX_WAIT_MS", "5"))
+# ImageNet label -> GBIF taxon table built by `python label_taxa.py build`
+LABEL_TAXA_PATH = os.getenv(
+    "LABEL_TAXA_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "label_taxa.json"),
+)
+# With the table present, drop top-5 labels that aren't animals
+OFFLINE_ANIMALS_ONLY = os.getenv("OFFLINE_ANIMALS_ONLY", "1") == "1"
+
+# -----------------------------
+# Identification result cache
+# -----------------------------
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "512"))
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Set to an empty string to keep the cache in memory only.
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", os.path.join(UPLOAD_FOLDER, "result_cache"))
+RESULT_CACHE_DISK_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_DISK_MAX_ENTRIES", "10000"))
+
+# -----------------------------
+# Near-duplicate reuse (perceptual hash)
+# -----------------------------
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "1") == "1"
+# Hamming distance out of 64 dHash bits
+NEAR_DUP_MAX_DISTANCE = int(os.getenv("NEAR_DUP_MAX_DISTANCE", "4"))
+# Persisted in RESULT_CACHE_DIR/near_dup.jsonl when the disk result cache is on
+NEAR_DUP_MAX_ENTRIES = int(os.getenv("NEAR_DUP_MAX_ENTRIES", "200000"))
+
+# -----------------------------
+# Image preprocessing (before cloud calls)
+# -----------------------------
+IMAGE_PREP_ENABLED = os.getenv("IMAGE_PREP_ENABLED", "1") == "1"
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1536"))
+# JPEG | WEBP
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG")
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+
+# -----------------------------
+# DashScope client pool
+# -----------------------------
+CLOUD_CLIENT_POOL_SIZE = int(os.getenv("CLOUD_CLIENT_POOL_SIZE", "16"))
+CLOUD_CLIENT_IDLE_SECONDS = float(os.getenv("CLOUD_CLIENT_IDLE_SECONDS", "1800"))
+CLOUD_MAX_CONNECTIONS = int(os.getenv("CLOUD_MAX_CONNECTIONS", "20"))
+CLOUD_MAX_KEEPALIVE = int(os.getenv("CLOUD_MAX_KEEPALIVE", "10"))
+CLOUD_KEEPALIVE_EXPIRY = float(os.getenv("CLOUD_KEEPALIVE_EXPIRY", "60"))
+CLOUD_CONNECT_TIMEOUT = float(os.getenv("CLOUD_CONNECT_TIMEOUT", "10"))
+CLOUD_READ_TIMEOUT = float(os.getenv("CLOUD_READ_TIMEOUT", "60"))
+# SDK-level retries; rate_limit.call_scheduled retries within the quota instead.
+CLOUD_MAX_RETRIES = int(os.getenv("CLOUD_MAX_RETRIES", "0"))
+# Show cloud results token by token instead of behind a spinner
+CLOUD_STREAMING = os.getenv("CLOUD_STREAMING", "1") == "1"
+
+# -----------------------------
+# Hedged identification + circuit breaker
+# -----------------------------
+# off | hedge | race
+CLOUD_HEDGE_MODE = os.getenv("CLOUD_HEDGE_MODE", "hedge")
+CLOUD_HEDGE_BUDGET_SECONDS = float(os.getenv("CLOUD_HEDGE_BUDGET_SECONDS", "6"))
+HEDGE_MAX_WORKERS = int(os.getenv("HEDGE_MAX_WORKERS", "16"))
+# Separate pool for the local fallback so slow cloud calls cannot starve it
+HEDGE_FALLBACK_WORKERS = int(os.getenv("HEDGE_FALLBACK_WORKERS", "4"))
+CLOUD_BREAKER_FAILURES = int(os.getenv("CLOUD_BREAKER_FAILURES", "3"))
+CLOUD_BREAKER_COOLDOWN_SECONDS = float(os.getenv("CLOUD_BREAKER_COOLDOWN_SECONDS", "60"))
+# When the local model answers first, fetch the cloud answer in the
+# background at batch priority and cache it for the next run
+CLOUD_PREFETCH_AFTER_LOCAL = os.getenv("CLOUD_PREFETCH_AFTER_LOCAL", "1") == "1"
+
+# -----------------------------
+# DashScope quota scheduler
+# -----------------------------
+# 0 disables a budget
+CLOUD_REQUESTS_PER_MINUTE = float(os.getenv("CLOUD_REQUESTS_PER_MINUTE", "60"))
+CLOUD_TOKENS_PER_MINUTE = float(os.getenv("CLOUD_TOKENS_PER_MINUTE", "100000"))
+CLOUD_EST_TOKENS_PER_CALL = int(os.getenv("CLOUD_EST_TOKENS_PER_CALL", "3000"))
+CLOUD_MAX_QUEUE = int(os.getenv("CLOUD_MAX_QUEUE", "64"))
+CLOUD_QUEUE_TIMEOUT = float(os.getenv("CLOUD_QUEUE_TIMEOUT", "30"))
+CLOUD_RETRIES = int(os.getenv("CLOUD_RETRIES", "3"))
+CLOUD_BACKOFF_BASE_SECONDS = float(os.getenv("CLOUD_BACKOFF_BASE_SECONDS", "0.5"))
+CLOUD_BACKOFF_MAX_SECONDS = float(os.getenv("CLOUD_BACKOFF_MAX_SECONDS", "8"))
+
+# -----------------------------
+# OSS upload tuning
+# -----------------------------
+# For local OSS/S3-compatible stand-ins
+OSS_USE_PATH_STYLE = os.getenv("OSS_USE_PATH_STYLE", "0") == "1"
+OSS_PUBLIC_BASE_URL = os.getenv("OSS_PUBLIC_BASE_URL", "")
+OSS_MULTIPART_THRESHOLD = int(os.getenv("OSS_MULTIPART_THRESHOLD", str(8 * 1024 * 1024)))
+OSS_MULTIPART_PART_SIZE = int(os.getenv("OSS_MULTIPART_PART_SIZE", str(2 * 1024 * 1024)))
+OSS_MULTIPART_PARALLEL = int(os.getenv("OSS_MULTIPART_PARALLEL", "3"))
+
+# -----------------------------
+# GBIF
+# -----------------------------
+GBIF_API_URL = os.getenv("GBIF_API_URL", "https://api.gbif.org/v1")
+# Shared by all worker processes on the host
+GBIF_CACHE_PATH = os.getenv("GBIF_CACHE_PATH", os.path.join("cache", "gbif.sqlite3"))
+GBIF_CACHE_TTL_SECONDS = int(os.getenv("GBIF_CACHE_TTL_SECONDS", str(60 * 60)))
+GBIF_CACHE_NEGATIVE_TTL_SECONDS = int(os.getenv("GBIF_CACHE_NEGATIVE_TTL_SECONDS", str(10 * 60)))
+GBIF_CACHE_MAX_ENTRIES = int(os.getenv("GBIF_CACHE_MAX_ENTRIES", "50000"))
+# Offline backbone index built by `python gbif_backbone.py import backbone.zip`
+GBIF_BACKBONE_INDEX_PATH = os.getenv("GBIF_BACKBONE_INDEX_PATH", os.path.join("cache", "backbone.sqlite3"))
+# api | local | auto (local index when present, else the API)
+GBIF_SEARCH_BACKEND = os.getenv("GBIF_SEARCH_BACKEND", "auto")
+# Expired entries are kept this long for revalidation before eviction
+GBIF_CACHE_KEEP_EXPIRED_SECONDS = int(os.getenv("GBIF_CACHE_KEEP_EXPIRED_SECONDS", str(7 * 24 * 3600)))
+GBIF_TIMEOUT = float(os.getenv("GBIF_TIMEOUT", "15"))
+GBIF_POOL_SIZE = int(os.getenv("GBIF_POOL_SIZE", "16"))
+GBIF_RETRIES = int(os.getenv("GBIF_RETRIES", "3"))
+GBIF_BACKOFF_FACTOR = float(os.getenv("GBIF_BACKOFF_FACTOR", "0.5"))
+# Details fetched in the background for the top search results
+GBIF_PREFETCH_TOP_N = int(os.getenv("GBIF_PREFETCH_TOP_N", "10"))
+GBIF_PREFETCH_WORKERS = int(os.getenv("GBIF_PREFETCH_WORKERS", "4"))
+# Name suggestions from the offline backbone index (no extra API calls)
+GBIF_SUGGEST_ENABLED = os.getenv("GBIF_SUGGEST_ENABLED", "1") == "1"
+GBIF_SUGGEST_LIMIT = int(os.getenv("GBIF_SUGGEST_LIMIT", "10"))
+GBIF_SUGGEST_CACHE_ENTRIES = int(os.getenv("GBIF_SUGGEST_CACHE_ENTRIES", "5000"))
+# Serve expired entries immediately and refresh them in the background
+GBIF_STALE_WHILE_REVALIDATE = os.getenv("GBIF_STALE_WHILE_REVALIDATE", "1") == "1"
+GBIF_MAX_STALE_SECONDS = int(os.getenv("GBIF_MAX_STALE_SECONDS", str(24 * 3600)))
+# When GBIF is unreachable, serve entries up to this far past expiry
+GBIF_MAX_STALE_ON_ERROR_SECONDS = int(os.getenv("GBIF_MAX_STALE_ON_ERROR_SECONDS", str(7 * 24 * 3600)))
+GBIF_REFRESH_WORKERS = int(os.getenv("GBIF_REFRESH_WORKERS", "2"))
+# Per-process st.cache_data layer above the shared cache
+GBIF_MEMORY_TTL_SECONDS = int(os.getenv("GBIF_MEMORY_TTL_SECONDS", "300"))
+# Concurrent /species/match calls in `python gbif_match.py` (keep <= GBIF_POOL_SIZE)
+GBIF_MATCH_WORKERS = int(os.getenv("GBIF_MATCH_WORKERS", "8"))
+
+# -----------------------------
+# Featured animals
+# -----------------------------
+# Curated records, one JSON object per line (ships next to the code)
+FEATURED_DATA_PATH = os.getenv(
+    "FEATURED_DATA_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "featured_animals.jsonl"),
+)
+# SQLite index built from it on first use (rebuilt when the JSONL changes)
+FEATURED_INDEX_PATH = os.getenv("FEATURED_INDEX_PATH", os.path.join("cache", "featured.sqlite3"))
+# Cards per page on a category page
+FEATURED_PAGE_SIZE = int(os.getenv("FEATURED_PAGE_SIZE", "12"))
+
+# -----------------------------
+# Featured image cache
+# -----------------------------
+IMAGE_CACHE_ENABLED = os.getenv("IMAGE_CACHE_ENABLED", "1") == "1"
+IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", os.path.join("cache", "images"))
+IMAGE_THUMB_EDGE = int(os.getenv("IMAGE_THUMB_EDGE", "400"))
+IMAGE_DETAIL_EDGE = int(os.getenv("IMAGE_DETAIL_EDGE", "800"))
+IMAGE_CACHE_QUALITY = int(os.getenv("IMAGE_CACHE_QUALITY", "80"))
+IMAGE_FETCH_TIMEOUT = float(os.getenv("IMAGE_FETCH_TIMEOUT", "15"))
+# A failed download is retried on a later render after this long
+IMAGE_FETCH_RETRY_SECONDS = float(os.getenv("IMAGE_FETCH_RETRY_SECONDS", "300"))
+# Fetch every featured image in the background at startup
+IMAGE_PREWARM = os.getenv("IMAGE_PREWARM", "1") == "1"
+IMAGE_PREWARM_WORKERS = int(os.getenv("IMAGE_PREWARM_WORKERS", "8"))
+# 0 = hand cached files to st.image; otherwise serve them from this port
+IMAGE_PROXY_PORT = int(os.getenv("IMAGE_PROXY_PORT", "0"))
+IMAGE_PROXY_HOST = os.getenv("IMAGE_PROXY_HOST", "127.0.0.1")
+# Browser-facing base URL of the proxy (e.g. https://example.com/images);
+# required with IMAGE_PROXY_PORT, otherwise the original image URLs are used
+IMAGE_PROXY_PUBLIC_URL = os.getenv("IMAGE_PROXY_PUBLIC_URL", "")
@@ -0,0 +1,252 @@
+# Full-text and fuzzy search over the featured animals
+# An in-memory inverted index (term -> {animal_id: weight}) over name,
+# scientific_name, description, habitat and facts, plus a trigram index
+# over the vocabulary. Query terms match exactly, as a prefix ("axolot"),
+# or within a small edit distance ("tigirs" -> "tigris"). Built from the
+# featured store on first use; when the store changes only the records
+# whose JSON differs are re-indexed.
+
+import bisect
+import hashlib
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+
+from animal_store import FEATURED_STORE
+
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "scientific_name": 3.0,
+    "habitat": 1.0,
+    "description": 1.0,
+    "facts": 0.8,
+}
+
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "by", "for", "from", "in", "is", "it",
+    "its", "of", "on", "or", "the", "to", "with",
+}
+
+PREFIX_SIMILARITY = 0.9
+MAX_PREFIX_EXPANSIONS = 32
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list:
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    return [t for t in _WORD.findall(text.lower()) if t not in STOP_WORDS]
+
+
+def trigrams(term: str) -> set:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Optimal string alignment distance (adjacent swaps cost 1), capped at max_distance + 1."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def _max_distance(term: str) -> int:
+    if len(term) <= 3:
+        return 0
+    return 1 if len(term) <= 8 else 2
+
+
+def _fingerprint(record: dict) -> str:
+    parts = [str(record.get(f, "")) for f in FIELD_WEIGHTS]
+    return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}     # term -> {doc_id: weight}
+        self._doc_terms = {}    # doc_id -> terms, for removal
+        self._fingerprints = {}
+        self._trigrams = {}     # trigram -> set(terms)
+        self._vocab = []        # sorted, for prefix lookups
+
+    # -----------------------------
+    # Maintenance
+    # -----------------------------
+    def _add_term(self, term: str) -> None:
+        bisect.insort(self._vocab, term)
+        for gram in trigrams(term):
+            self._trigrams.setdefault(gram, set()).add(term)
+
+    def _drop_term(self, term: str) -> None:
+        i = bisect.bisect_left(self._vocab, term)
+        if i < len(self._vocab) and self._vocab[i] == term:
+            del self._vocab[i]
+        for gram in trigrams(term):
+            terms = self._trigrams.get(gram)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._trigrams[gram]
+
+    def _remove(self, doc_id: str) -> None:
+        for term in self._doc_terms.pop(doc_id, ()):
+            docs = self._postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self._postings[term]
+                self._drop_term(term)
+        self._fingerprints.pop(doc_id, None)
+
+    def _add(self, doc_id: str, record: dict) -> None:
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            value = record.get(field) or ""
+            if isinstance(value, list):
+                value = " ".join(value)
+            for term in tokenize(value):
+                weights[term] = weights.get(term, 0.0) + weight
+
+        for term, weight in weights.items():
+            docs = self._postings.get(term)
+            if docs is None:
+                docs = self._postings[term] = {}
+                self._add_term(term)
+            # Repeats help, but with diminishing returns.
+            docs[doc_id] = 1.0 + math.log(weight) if weight > 1.0 else weight
+        self._doc_terms[doc_id] = list(weights)
+        self._fingerprints[doc_id] = _fingerprint(record)
+
+    def upsert(self, doc_id: str, record: dict) -> bool:
+        """Index or re-index one record. Returns False if it was unchanged."""
+        with self._lock:
+            if self._fingerprints.get(doc_id) == _fingerprint(record):
+                return False
+            self._remove(doc_id)
+            self._add(doc_id, record)
+            return True
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove(doc_id)
+
+    def sync(self, records) -> dict:
+        """Bring the index in line with (doc_id, record) pairs; touches only changed docs."""
+        seen, changed = set(), 0
+        for doc_id, record in records:
+            seen.add(doc_id)
+            changed += self.upsert(doc_id, record)
+        with self._lock:
+            stale = [d for d in self._doc_terms if d not in seen]
+            for doc_id in stale:
+                self._remove(doc_id)
+        return {"changed": changed, "removed": len(stale), "documents": len(seen)}
+
+    # -----------------------------
+    # Query
+    # -----------------------------
+    def _expand(self, q: str) -> dict:
+        """Index terms matching query term q, with a similarity in (0, 1]."""
+        matches = {}
+        if q in self._postings:
+            matches[q] = 1.0
+
+        if len(q) >= 2:
+            i = bisect.bisect_left(self._vocab, q)
+            for term in self._vocab[i:i + MAX_PREFIX_EXPANSIONS + 1]:
+                if not term.startswith(q):
+                    break
+                matches.setdefault(term, PREFIX_SIMILARITY)
+
+        max_d = _max_distance(q)
+        if not matches and max_d:
+            grams = trigrams(q)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._trigrams.get(gram, ()))
+            # One edit (or adjacent swap) touches at most 4 padded trigrams.
+            min_shared = max(1, len(grams) - 4 * max_d)
+            for term, count in shared.items():
+                if count < min_shared or abs(len(term) - len(q)) > max_d:
+                    continue
+                d = edit_distance(q, term, max_d)
+                if d <= max_d:
+                    matches[term] = 1.0 - d / (len(q) + 1)
+        return matches
+
+    def search(self, query: str, limit: int = 10) -> list:
+        """Ranked [{"id", "score"}] for query; every query term should match something."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            n_docs = max(1, len(self._doc_terms))
+            scores, matched = {}, {}
+            for q in terms:
+                best = {}
+                for term, similarity in self._expand(q).items():
+                    docs = self._postings[term]
+                    idf = math.log(1.0 + n_docs / len(docs))
+                    for doc_id, weight in docs.items():
+                        s = similarity * weight * idf
+                        if s > best.get(doc_id, 0.0):
+                            best[doc_id] = s
+                for doc_id, s in best.items():
+                    scores[doc_id] = scores.get(doc_id, 0.0) + s
+                    matched[doc_id] = matched.get(doc_id, 0) + 1
+
+        # Documents matching more of the query rank above partial matches.
+        ranked = heapq.nlargest(
+            limit, scores.items(), key=lambda item: (matched[item[0]], item[1])
+        )
+        return [{"id": doc_id, "score": round(score, 4)} for doc_id, score in ranked]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"documents": len(self._doc_terms), "terms": len(self._postings)}
+
+
+class FeaturedSearch:
+    """SearchIndex kept in step with FEATURED_STORE."""
+
+    def __init__(self, store):
+        self._store = store
+        self._index = SearchIndex()
+        self._lock = threading.Lock()
+        self._generation = None
+
+    def _ensure_current(self) -> None:
+        generation = self._store.generation()
+        if generation == self._generation:
+            return
+        with self._lock:
+            if generation != self._generation:
+                self._index.sync(self._store.iter_records())
+                self._generation = generation
+
+    def search(self, query: str, limit: int = 10) -> list:
+        self._ensure_current()
+        return self._index.search(query, limit=limit)
+
+    def stats(self) -> dict:
+        return self._index.stats()
+
+
+FEATURED_SEARCH = FeaturedSearch(FEATURED_STORE)
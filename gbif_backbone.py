@@ -0,0 +1,355 @@
+# Offline GBIF backbone index
+# Streams the GBIF backbone taxonomy dump (backbone.zip, or a folder with
+# Taxon.tsv / VernacularName.tsv) into a compact SQLite file, then answers
+# gbif_client.species_search_page queries from it with prefix and trigram
+# (FTS5) search over canonical and vernacular names. Works air-gapped.
+#
+# Import reads the TSVs row by row and writes in fixed-size batches, so
+# memory stays bounded for multi-GB dumps.
+#
+# Usage:
+#   python gbif_backbone.py import backbone.zip [--out cache/backbone.sqlite3]
+#   python gbif_backbone.py search "panthera tig"
+
+import argparse
+import csv
+import io
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zipfile
+
+import config
+
+BATCH_SIZE = 10000
+
+# Bump when the schema changes; older index files are ignored until re-imported.
+SCHEMA_VERSION = 2
+
+KIND_CANONICAL = 0
+KIND_SCIENTIFIC = 1
+KIND_VERNACULAR = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS taxa (
+    key INTEGER PRIMARY KEY,
+    scientific_name TEXT,
+    canonical_name TEXT,
+    rank TEXT,
+    status TEXT,
+    accepted_key INTEGER,
+    kingdom TEXT,
+    phylum TEXT,
+    class TEXT,
+    "order" TEXT,
+    family TEXT,
+    genus TEXT
+);
+CREATE TABLE IF NOT EXISTS names (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_lc TEXT NOT NULL,
+    key INTEGER NOT NULL,
+    kind INTEGER NOT NULL
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS names_name_lc ON names (name_lc);
+CREATE INDEX IF NOT EXISTS names_key ON names (key);
+CREATE VIRTUAL TABLE IF NOT EXISTS names_fts USING fts5(
+    name, content='names', content_rowid='id', tokenize='trigram'
+);
+INSERT INTO names_fts(names_fts) VALUES ('rebuild');
+"""
+
+TAXON_COLUMNS = {
+    "taxonID": "key",
+    "scientificName": "scientific_name",
+    "canonicalName": "canonical_name",
+    "taxonRank": "rank",
+    "taxonomicStatus": "status",
+    "acceptedNameUsageID": "accepted_key",
+    "kingdom": "kingdom",
+    "phylum": "phylum",
+    "class": "class",
+    "order": "order",
+    "family": "family",
+    "genus": "genus",
+}
+
+
+# -----------------------------
+# Import
+# -----------------------------
+def _open_member(source: str, filename: str):
+    """Text stream for a file inside backbone.zip or a plain folder."""
+    if zipfile.is_zipfile(source):
+        # An open member keeps the archive's file open until the member itself
+        # is closed, so the archive can be closed as soon as we return.
+        with zipfile.ZipFile(source) as archive:
+            for name in archive.namelist():
+                if os.path.basename(name) == filename:
+                    return io.TextIOWrapper(archive.open(name), encoding="utf-8", newline="")
+        raise FileNotFoundError(f"{filename} not found in {source}")
+    return open(os.path.join(source, filename), encoding="utf-8", newline="")
+
+
+def _rows(stream):
+    csv.field_size_limit(sys.maxsize)
+    reader = csv.reader(stream, delimiter="\t", quoting=csv.QUOTE_NONE)
+    header = next(reader)
+    for row in reader:
+        yield dict(zip(header, row))
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def import_backbone(source: str, out_path: str, languages=("en", ""), progress=None) -> dict:
+    """
+    Build the index at out_path (replaced atomically when done).
+    Only vernacular names in `languages` are kept ("" = unspecified).
+    """
+    directory = os.path.dirname(out_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript(SCHEMA)
+
+    counts = {"taxa": 0, "vernacular": 0}
+    started = time.perf_counter()
+
+    taxa_batch, names_batch = [], []
+
+    def flush():
+        conn.executemany(
+            'INSERT OR REPLACE INTO taxa (key, scientific_name, canonical_name, rank, status, '
+            'accepted_key, kingdom, phylum, class, "order", family, genus) '
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            taxa_batch,
+        )
+        conn.executemany(
+            "INSERT INTO names (name, name_lc, key, kind) VALUES (?, ?, ?, ?)", names_batch
+        )
+        conn.commit()
+        taxa_batch.clear()
+        names_batch.clear()
+        if progress:
+            progress(counts)
+
+    with _open_member(source, "Taxon.tsv") as stream:
+        for row in _rows(stream):
+            rec = {col: row.get(src, "") for src, col in TAXON_COLUMNS.items()}
+            key = _int_or_none(rec["key"])
+            if key is None:
+                continue
+            taxa_batch.append((
+                key, rec["scientific_name"], rec["canonical_name"], rec["rank"].upper(),
+                rec["status"].upper(), _int_or_none(rec["accepted_key"]), rec["kingdom"],
+                rec["phylum"], rec["class"], rec["order"], rec["family"], rec["genus"],
+            ))
+            canonical = rec["canonical_name"]
+            if canonical:
+                names_batch.append((canonical, canonical.lower(), key, KIND_CANONICAL))
+            scientific = rec["scientific_name"]
+            if scientific and scientific != canonical:
+                names_batch.append((scientific, scientific.lower(), key, KIND_SCIENTIFIC))
+            counts["taxa"] += 1
+            if len(taxa_batch) >= BATCH_SIZE:
+                flush()
+    flush()
+
+    try:
+        stream = _open_member(source, "VernacularName.tsv")
+    except FileNotFoundError:
+        stream = None
+    if stream is not None:
+        with stream:
+            for row in _rows(stream):
+                name = row.get("vernacularName", "").strip()
+                key = _int_or_none(row.get("taxonID"))
+                if not name or key is None or row.get("language", "") not in languages:
+                    continue
+                names_batch.append((name, name.lower(), key, KIND_VERNACULAR))
+                counts["vernacular"] += 1
+                if len(names_batch) >= BATCH_SIZE:
+                    flush()
+        flush()
+
+    # Indexes are cheaper to build once at the end than to maintain per insert.
+    conn.executescript(INDEXES)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, out_path)
+
+    counts["seconds"] = time.perf_counter() - started
+    return counts
+
+
+# -----------------------------
+# Search
+# -----------------------------
+def _result(row, vernacular: str = "") -> dict:
+    """Shape a taxa row like a /species/search result."""
+    keys = ["key", "scientificName", "canonicalName", "rank", "taxonomicStatus",
+            "acceptedKey", "kingdom", "phylum", "class", "order", "family", "genus"]
+    out = {k: v for k, v in zip(keys, row) if v not in (None, "")}
+    if vernacular:
+        out["vernacularNames"] = [{"vernacularName": vernacular}]
+    return out
+
+
+class BackboneIndex:
+    def __init__(self, path: str):
+        self._path = path
+        self._local = threading.local()
+        self._checked = None  # (size, mtime) of the file last found current
+
+    def available(self) -> bool:
+        try:
+            st = os.stat(self._path)
+        except OSError:
+            return False
+        stamp = (st.st_size, st.st_mtime_ns)
+        if self._checked != stamp:
+            conn = sqlite3.connect(f"file:{self._path}?mode=ro", uri=True)
+            try:
+                version = conn.execute("PRAGMA user_version").fetchone()[0]
+            except sqlite3.DatabaseError:
+                version = None
+            finally:
+                conn.close()
+            if version != SCHEMA_VERSION:
+                return False
+            self._checked = stamp
+        return True
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self._path}?mode=ro", uri=True)
+            self._local.conn = conn
+        return conn
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        rank: str = None,
+        kingdom: str = None,
+        offset: int = 0,
+    ) -> list:
+        q = query.strip().lower()
+        if not q:
+            return []
+
+        # Pages past the first re-rank from the top; fine for the few pages a UI asks for.
+        page_end = offset + limit
+
+        conn = self._conn()
+        filters, args = "", []
+        if rank:
+            filters += " AND t.rank = ?"
+            args.append(rank.upper())
+        if kingdom:
+            filters += " AND t.kingdom = ?"
+            args.append(kingdom)
+
+        columns = (
+            't.key, t.scientific_name, t.canonical_name, t.rank, t.status, t.accepted_key, '
+            't.kingdom, t.phylum, t.class, t."order", t.family, t.genus'
+        )
+
+        # 1) Exact and prefix matches, read in index order so large
+        #    prefixes stop early; ranked below.
+        select = f"SELECT {columns}, n.name, n.kind FROM names n JOIN taxa t ON t.key = n.key "
+        rows = conn.execute(
+            select + f"WHERE n.name_lc = ?{filters} LIMIT ?", [q, *args, page_end * 3]
+        ).fetchall()
+        prefix_rows = conn.execute(
+            select + f"WHERE n.name_lc > ? AND n.name_lc < ?{filters} "
+            "ORDER BY n.name_lc LIMIT ?",
+            [q, q + "\uffff", *args, page_end * 3],
+        ).fetchall()
+        # Canonical before vernacular, accepted before synonyms, shorter first.
+        prefix_rows.sort(key=lambda r: (r[13], r[4] != "ACCEPTED", len(r[12])))
+        rows += prefix_rows
+
+        # 2) Substring matches anywhere in a name via the trigram index.
+        if len(rows) < page_end and len(q) >= 3:
+            fts_query = '"' + q.replace('"', '""') + '"'
+            rows += conn.execute(
+                f"SELECT {columns}, n.name, n.kind FROM names_fts f "
+                "JOIN names n ON n.id = f.rowid JOIN taxa t ON t.key = n.key "
+                f"WHERE names_fts MATCH ?{filters} "
+                "ORDER BY f.rank, t.status != 'ACCEPTED' LIMIT ?",
+                [fts_query, *args, page_end * 3],
+            ).fetchall()
+
+        results, seen = [], set()
+        for row in rows:
+            key = row[0]
+            if key in seen:
+                continue
+            seen.add(key)
+            results.append(_result(row[:12], row[12] if row[13] == KIND_VERNACULAR else ""))
+            if len(results) >= page_end:
+                break
+        return results[offset:]
+
+
+BACKBONE_INDEX = BackboneIndex(config.GBIF_BACKBONE_INDEX_PATH)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline GBIF backbone index")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_import = sub.add_parser("import", help="Build the index from backbone.zip or a folder")
+    p_import.add_argument("source")
+    p_import.add_argument("--out", default=config.GBIF_BACKBONE_INDEX_PATH)
+    p_import.add_argument("--languages", default="en,", help="Vernacular languages to keep")
+
+    p_search = sub.add_parser("search", help="Query the index")
+    p_search.add_argument("query")
+    p_search.add_argument("--limit", type=int, default=10)
+    p_search.add_argument("--index", default=config.GBIF_BACKBONE_INDEX_PATH)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        counts = import_backbone(
+            args.source,
+            args.out,
+            languages=tuple(args.languages.split(",")),
+            progress=lambda c: print(f"\r{c['taxa']} taxa, {c['vernacular']} vernacular names",
+                                     end="", file=sys.stderr),
+        )
+        print(f"\nDone in {counts['seconds']:.0f} s -> {args.out}", file=sys.stderr)
+        return 0
+
+    started = time.perf_counter()
+    results = BackboneIndex(args.index).search(args.query, limit=args.limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    for r in results:
+        print(f"{r['key']}\t{r.get('rank', '')}\t{r.get('canonicalName') or r.get('scientificName')}")
+    print(f"{len(results)} results in {elapsed:.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+# Shared on-disk cache for GBIF responses
+# SQLite in WAL mode, so several Streamlit worker processes on one host
+# can read and write the same file safely, and the cache survives restarts.
+# Entries have a TTL; empty results get a shorter negative TTL; the least
+# recently used entries are evicted past max_entries. ETag / Last-Modified
+# validators are kept with each entry so expired ones can be revalidated.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL,
+    negative INTEGER NOT NULL DEFAULT 0,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+"""
+
+
+def is_empty_result(value) -> bool:
+    if isinstance(value, dict) and "results" in value:
+        return not value["results"]
+    return value is None or value == [] or value == {}
+
+
+class DiskCache:
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = 3600,
+        negative_ttl_seconds: float = 600,
+        max_entries: int = 50000,
+        keep_expired_seconds: float = 7 * 24 * 3600,
+    ):
+        self._path = path
+        self._keep_expired = keep_expired_seconds
+        self._ttl = ttl_seconds
+        self._negative_ttl = negative_ttl_seconds
+        self._max_entries = max(1, max_entries)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._hits = 0
+        self._negative_hits = 0
+        self._misses = 0
+        self._revalidated = 0
+        self._stale_served = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        self._migrate(conn)
+
+    def _migrate(self, conn: sqlite3.Connection) -> None:
+        # Cache files created before validators were stored.
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+        for column in ("etag", "last_modified"):
+            if column not in columns:
+                try:
+                    conn.execute(f"ALTER TABLE entries ADD COLUMN {column} TEXT")
+                except sqlite3.OperationalError:
+                    pass  # another process added it first
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=10000")
+            self._local.conn = conn
+        return conn
+
+    def get_entry(self, key: str):
+        """
+        The raw entry, expired or not: dict with value, expires, negative,
+        etag and last_modified. None if the key was never stored.
+        """
+        row = self._conn().execute(
+            "SELECT value, expires, negative, etag, last_modified FROM entries WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "value": json.loads(row[0]),
+            "expires": row[1],
+            "negative": bool(row[2]),
+            "etag": row[3],
+            "last_modified": row[4],
+        }
+
+    def get(self, key: str):
+        """Returns (found, value). Expired entries count as misses."""
+        entry = self.get_entry(key)
+        fresh = entry is not None and entry["expires"] >= time.time()
+        self.record_lookup(key, entry if fresh else None)
+        return (True, entry["value"]) if fresh else (False, None)
+
+    def record_lookup(self, key: str, fresh_entry) -> None:
+        """Update counters (and LRU order on a hit) for a lookup done via get_entry."""
+        if fresh_entry is None:
+            with self._lock:
+                self._misses += 1
+            return
+
+        self._conn().execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        with self._lock:
+            if fresh_entry["negative"]:
+                self._negative_hits += 1
+            else:
+                self._hits += 1
+
+    def record_stale(self, key: str) -> None:
+        """Count an expired entry served as-is (stale-while-revalidate or on error)."""
+        self._conn().execute("UPDATE entries SET accessed = ? WHERE key = ?", (time.time(), key))
+        with self._lock:
+            self._stale_served += 1
+
+    def set(
+        self,
+        key: str,
+        value,
+        ttl_seconds: float = None,
+        etag: str = None,
+        last_modified: str = None,
+    ) -> None:
+        now = time.time()
+        negative = is_empty_result(value)
+        if ttl_seconds is None:
+            ttl_seconds = self._negative_ttl if negative else self._ttl
+
+        self._conn().execute(
+            "INSERT OR REPLACE INTO entries "
+            "(key, value, created, expires, accessed, negative, etag, last_modified) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, json.dumps(value), now, now + ttl_seconds, now, int(negative),
+             etag, last_modified),
+        )
+
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % 200 == 0
+        if should_evict:
+            self.evict()
+
+    def touch(self, key: str, ttl_seconds: float = None) -> None:
+        """Extend an entry's lifetime after a 304 Not Modified."""
+        now = time.time()
+        self._conn().execute(
+            "UPDATE entries SET expires = ? + "
+            "(CASE WHEN negative THEN ? ELSE ? END), accessed = ? WHERE key = ?",
+            (now,
+             ttl_seconds if ttl_seconds is not None else self._negative_ttl,
+             ttl_seconds if ttl_seconds is not None else self._ttl,
+             now, key),
+        )
+        with self._lock:
+            self._revalidated += 1
+
+    def evict(self) -> int:
+        """
+        Drop entries expired for longer than keep_expired_seconds (recently
+        expired ones are still useful for revalidation), then the least
+        recently used ones past max_entries.
+        """
+        conn = self._conn()
+        removed = conn.execute(
+            "DELETE FROM entries WHERE expires < ?", (time.time() - self._keep_expired,)
+        ).rowcount
+        count = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        overflow = count - self._max_entries
+        if overflow > 0:
+            removed += conn.execute(
+                "DELETE FROM entries WHERE key IN "
+                "(SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                (overflow,),
+            ).rowcount
+        return removed
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "negative_hits": self._negative_hits,
+                "misses": self._misses,
+                "writes": self._writes,
+                "revalidated": self._revalidated,
+                "stale_served": self._stale_served,
+            }
+
+
+GBIF_CACHE = DiskCache(
+    config.GBIF_CACHE_PATH,
+    ttl_seconds=config.GBIF_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=config.GBIF_CACHE_NEGATIVE_TTL_SECONDS,
+    max_entries=config.GBIF_CACHE_MAX_ENTRIES,
+    keep_expired_seconds=config.GBIF_CACHE_KEEP_EXPIRED_SECONDS,
+)
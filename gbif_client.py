@@ -0,0 +1,254 @@
+# GBIF species API client
+# Used by the encyclopedia page; responses go through the shared
+# on-disk cache in gbif_cache.py. Searches can also be answered by the
+# offline backbone index (gbif_backbone.py), see GBIF_SEARCH_BACKEND.
+#
+# All requests share one pooled requests.Session with urllib3 retries.
+# Expired cache entries are revalidated with If-None-Match /
+# If-Modified-Since, so an unchanged response costs a 304, not a download.
+#
+# Stale-while-revalidate: an entry expired less than GBIF_MAX_STALE_SECONDS
+# ago is returned immediately while a background refresh runs, and stale
+# entries are also served when GBIF is unreachable.
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import config
+from gbif_backbone import BACKBONE_INDEX
+from gbif_cache import GBIF_CACHE
+from singleflight import GBIF_FLIGHTS
+
+
+def build_session() -> requests.Session:
+    retry = Retry(
+        total=config.GBIF_RETRIES,
+        backoff_factor=config.GBIF_BACKOFF_FACTOR,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=config.GBIF_POOL_SIZE,
+        pool_maxsize=config.GBIF_POOL_SIZE,
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip, deflate",
+        "User-Agent": "global-animal-explorer",
+    })
+    return session
+
+
+SESSION = build_session()
+
+# GBIF backbone kingdom keys
+ANIMALIA_KEY = 1
+KINGDOM_NAMES = {ANIMALIA_KEY: "Animalia"}
+
+
+REFRESH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=config.GBIF_REFRESH_WORKERS, thread_name_prefix="gbif-refresh"
+)
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _refresh_in_background(cache_key: str, entry, url: str, params, transform, missing) -> None:
+    with _refreshing_lock:
+        if cache_key in _refreshing:
+            return
+        _refreshing.add(cache_key)
+
+    def run():
+        try:
+            GBIF_FLIGHTS.do(
+                cache_key,
+                lambda: _fetch_and_store(cache_key, entry, url, params, transform, missing),
+            )
+        except Exception:
+            pass  # keep serving the stale entry; the next request tries again
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(cache_key)
+
+    REFRESH_EXECUTOR.submit(run)
+
+
+def cached_get_json(cache_key: str, url: str, params: dict = None, transform=None, missing=None):
+    """
+    GET a JSON resource through GBIF_CACHE. A fresh entry is returned as is;
+    a recently expired one is served stale while it is revalidated in the
+    background; a 404 stores and returns `missing`. Concurrent misses for
+    the same key share one request.
+
+    Keys are scoped to GBIF_API_URL, so runs against another endpoint
+    (a mock, via --api-url) never read or write production entries.
+    """
+    cache_key = f"{config.GBIF_API_URL}|{cache_key}"
+    entry = GBIF_CACHE.get_entry(cache_key)
+    now = time.time()
+    if entry is not None and entry["expires"] >= now:
+        GBIF_CACHE.record_lookup(cache_key, entry)
+        return entry["value"]
+
+    stale_for = now - entry["expires"] if entry is not None else None
+    if (
+        entry is not None
+        and config.GBIF_STALE_WHILE_REVALIDATE
+        and stale_for <= config.GBIF_MAX_STALE_SECONDS
+    ):
+        GBIF_CACHE.record_stale(cache_key)
+        _refresh_in_background(cache_key, entry, url, params, transform, missing)
+        return entry["value"]
+
+    GBIF_CACHE.record_lookup(cache_key, None)
+    try:
+        return GBIF_FLIGHTS.do(
+            cache_key, lambda: _fetch_and_store(cache_key, entry, url, params, transform, missing)
+        )
+    except requests.RequestException as e:
+        # GBIF unreachable or failing: old data beats an error page.
+        if entry is None or stale_for > config.GBIF_MAX_STALE_ON_ERROR_SECONDS:
+            raise
+        status = getattr(getattr(e, "response", None), "status_code", None)
+        if status is not None and status < 500 and status != 429:
+            raise
+        GBIF_CACHE.record_stale(cache_key)
+        return entry["value"]
+
+
+def _fetch_and_store(cache_key: str, entry, url: str, params, transform, missing):
+    headers = {}
+    if entry is not None:
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    r = SESSION.get(url, params=params, headers=headers, timeout=config.GBIF_TIMEOUT)
+    if r.status_code == 304 and entry is not None:
+        GBIF_CACHE.touch(cache_key)
+        return entry["value"]
+
+    if r.status_code == 404:
+        value = missing
+    else:
+        r.raise_for_status()
+        value = r.json()
+        if transform is not None:
+            value = transform(value)
+
+    GBIF_CACHE.set(
+        cache_key,
+        value,
+        etag=r.headers.get("ETag"),
+        last_modified=r.headers.get("Last-Modified"),
+    )
+    return value
+
+
+def use_local_search() -> bool:
+    backend = (config.GBIF_SEARCH_BACKEND or "auto").lower()
+    if backend == "local":
+        return True
+    return backend == "auto" and BACKBONE_INDEX.available()
+
+
+def species_search_page(
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    rank: str = None,
+    higher_taxon_key: int = None,
+) -> dict:
+    """
+    One page of /species/search with rank / higher-taxon filters applied
+    server-side. Returns {"results", "offset", "end_of_records"}; the next
+    page starts at offset + limit.
+    """
+    if use_local_search():
+        kingdom = KINGDOM_NAMES.get(higher_taxon_key)
+        results = BACKBONE_INDEX.search(
+            query, limit=limit + 1, rank=rank, kingdom=kingdom, offset=offset
+        )
+        return {
+            "results": results[:limit],
+            "offset": offset,
+            "end_of_records": len(results) <= limit,
+        }
+
+    params = {"q": query, "limit": limit, "offset": offset}
+    if rank:
+        params["rank"] = rank
+    if higher_taxon_key is not None:
+        params["highertaxonKey"] = higher_taxon_key
+
+    return cached_get_json(
+        "search:" + json.dumps(params, sort_keys=True),
+        f"{config.GBIF_API_URL}/species/search",
+        params=params,
+        transform=lambda data: {
+            "results": data.get("results", []),
+            "offset": data.get("offset", offset),
+            "end_of_records": data.get("endOfRecords", True),
+        },
+        missing={"results": [], "offset": offset, "end_of_records": True},
+    )
+
+
+def species_search(query: str, limit: int = 20) -> list:
+    return species_search_page(query, limit=limit)["results"]
+
+
+def species_detail(key: int) -> dict:
+    return cached_get_json(
+        f"detail:{key}",
+        f"{config.GBIF_API_URL}/species/{key}",
+        missing={},
+    )
+
+
+# -----------------------------
+# Detail prefetch
+# -----------------------------
+PREFETCH_EXECUTOR = ThreadPoolExecutor(
+    max_workers=config.GBIF_PREFETCH_WORKERS, thread_name_prefix="gbif-prefetch"
+)
+
+
+def _prefetch_detail(key: int) -> None:
+    try:
+        species_detail(key)
+    except Exception:
+        pass  # the user can still load it on demand
+
+
+def prefetch_details(keys: list) -> list:
+    """
+    Warm the detail cache for `keys` in the background. Returns the futures;
+    pass them to cancel_prefetch() when the query changes.
+
+    Skipped when searches come from the local backbone index: that backend is
+    used to keep the page off the network, and details are only fetched live
+    when a user opens one.
+    """
+    if use_local_search():
+        return []
+    return [PREFETCH_EXECUTOR.submit(_prefetch_detail, key) for key in keys if key is not None]
+
+
+def cancel_prefetch(futures: list) -> int:
+    """Cancel prefetches that haven't started yet. Returns how many were cancelled."""
+    return sum(1 for fut in futures if fut.cancel())
@@ -0,0 +1,177 @@
+# Batch GBIF name matching
+# Resolves species names from a CSV or JSONL file to GBIF backbone keys
+# via /species/match, with a bounded pool of concurrent workers. Responses
+# go through the shared on-disk GBIF cache; results are appended to a JSONL
+# file as they complete, so an interrupted run resumes where it stopped.
+#
+# Usage:
+#   python gbif_match.py names.csv matches.jsonl [--column name] [--workers 8]
+#   python gbif_match.py survey.jsonl matches.jsonl --kingdom Animalia
+#
+# For testing, run `python mock_gbif.py` and pass --api-url http://127.0.0.1:8765/v1
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import config
+import gbif_client
+
+MATCH_FIELDS = [
+    "usageKey", "acceptedUsageKey", "scientificName", "canonicalName", "rank",
+    "status", "confidence", "matchType", "kingdom", "phylum", "class", "order",
+    "family", "genus", "species",
+]
+
+
+def read_names(path: str, column: str = "name"):
+    """Yield (row_number, name) from a CSV (header row) or JSONL file."""
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.lower().endswith((".jsonl", ".ndjson", ".json")):
+            for i, line in enumerate(f):
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                name = record.get(column) if isinstance(record, dict) else record
+                if name:
+                    yield i, str(name).strip()
+        else:
+            reader = csv.DictReader(f)
+            field = column if column in (reader.fieldnames or []) else (reader.fieldnames or [None])[0]
+            for i, record in enumerate(reader):
+                name = (record.get(field) or "").strip()
+                if name:
+                    yield i, name
+
+
+def completed_rows(out_path: str) -> set:
+    """Row numbers already written by an earlier (possibly interrupted) run."""
+    done = set()
+    if not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["row"])
+            except (ValueError, KeyError, TypeError):
+                continue  # a line cut off by the interruption
+    return done
+
+
+def match_name(name: str, kingdom: str = None, strict: bool = False) -> dict:
+    params = {"name": name, "strict": str(strict).lower()}
+    if kingdom:
+        params["kingdom"] = kingdom
+    return gbif_client.cached_get_json(
+        "match:" + json.dumps(params, sort_keys=True),
+        f"{config.GBIF_API_URL}/species/match",
+        params=params,
+        missing={},
+    )
+
+
+def _result(row: int, name: str, match: dict = None, error: str = "") -> dict:
+    out = {"row": row, "name": name}
+    if match is not None:
+        out.update({k: match.get(k) for k in MATCH_FIELDS if k in match})
+    if error:
+        out["error"] = error
+    return out
+
+
+def run(
+    in_path: str,
+    out_path: str,
+    column: str = "name",
+    workers: int = 8,
+    kingdom: str = None,
+    strict: bool = False,
+    progress=None,
+) -> dict:
+    done = completed_rows(out_path)
+    counts = {"skipped": len(done), "matched": 0, "unmatched": 0, "failed": 0}
+    started = time.perf_counter()
+
+    def task(row, name):
+        try:
+            return _result(row, name, match_name(name, kingdom=kingdom, strict=strict))
+        except Exception as e:
+            return _result(row, name, error=str(e))
+
+    # Keep a bounded window of in-flight names so memory doesn't grow with the input.
+    max_in_flight = max(1, workers) * 4
+    with open(out_path, "a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = set()
+
+        def drain(block_until_below: int):
+            nonlocal pending
+            while len(pending) > block_until_below:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    result = fut.result()
+                    if result.get("error"):
+                        # Not written, so a re-run retries it.
+                        counts["failed"] += 1
+                        continue
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    if result.get("usageKey") is not None:
+                        counts["matched"] += 1
+                    else:
+                        counts["unmatched"] += 1
+                out.flush()
+                if progress:
+                    progress(counts)
+
+        for row, name in read_names(in_path, column):
+            if row in done:
+                continue
+            pending.add(pool.submit(task, row, name))
+            drain(max_in_flight - 1)
+        drain(0)
+
+    counts["seconds"] = time.perf_counter() - started
+    return counts
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Resolve species names to GBIF backbone keys")
+    parser.add_argument("input", help="CSV with a header row, or JSONL")
+    parser.add_argument("output", help="JSONL results (appended; used to resume)")
+    parser.add_argument("--column", default="name", help="CSV column / JSON field with the name")
+    parser.add_argument("--workers", type=int, default=config.GBIF_MATCH_WORKERS)
+    parser.add_argument("--kingdom", default=None, help="e.g. Animalia")
+    parser.add_argument("--strict", action="store_true")
+    parser.add_argument("--api-url", default=None, help="Override GBIF_API_URL (e.g. a mock server)")
+    args = parser.parse_args(argv)
+
+    if args.api_url:
+        config.GBIF_API_URL = args.api_url.rstrip("/")
+
+    counts = run(
+        args.input,
+        args.output,
+        column=args.column,
+        workers=args.workers,
+        kingdom=args.kingdom,
+        strict=args.strict,
+        progress=lambda c: print(
+            f"\r{c['matched']} matched, {c['unmatched']} unmatched, {c['failed']} failed",
+            end="", file=sys.stderr,
+        ),
+    )
+    print(
+        f"\nDone in {counts['seconds']:.1f} s "
+        f"({counts['skipped']} rows already done from a previous run).",
+        file=sys.stderr,
+    )
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+# Name suggestions for the encyclopedia search, answered locally
+# Suggestions never cost a round trip on top of /species/search: they
+# come from the offline backbone index (gbif_backbone.py) when one is
+# installed, through a prefix trie cache:
+# - if "pant" returned fewer than `limit` names, that list is complete,
+#   so "panth" is answered by filtering it instead of querying again.
+# Without a backbone index there are no suggestions.
+
+import threading
+
+import config
+from gbif_backbone import BACKBONE_INDEX
+
+
+def _matches(result: dict, q: str) -> bool:
+    """Does a suggestion match query q? (start of a name or of a word in it)"""
+    names = [result.get("canonicalName"), result.get("scientificName")]
+    names += [v.get("vernacularName") for v in result.get("vernacularNames", [])]
+    for name in names:
+        name = (name or "").lower()
+        if name.startswith(q) or f" {q}" in name:
+            return True
+    return False
+
+
+class PrefixTrie:
+    """Maps query prefixes to suggestion lists. Nodes are [children, entry]."""
+
+    def __init__(self, max_entries: int = 5000):
+        self._root = [{}, None]
+        self._entries = 0
+        self._max_entries = max(1, max_entries)
+
+    def insert(self, prefix: str, results: list, complete: bool) -> None:
+        if self._entries >= self._max_entries:
+            # Cheap bound: start over rather than track per-node recency.
+            self._root = [{}, None]
+            self._entries = 0
+
+        node = self._root
+        for ch in prefix:
+            node = node[0].setdefault(ch, [{}, None])
+        if node[1] is None:
+            self._entries += 1
+        node[1] = (results, complete)
+
+    def lookup(self, q: str, limit: int):
+        """Results for q from an exact entry or a complete shorter prefix, else None."""
+        node = self._root
+        best = None
+        for ch in q:
+            node = node[0].get(ch)
+            if node is None:
+                break
+            if node[1] is not None and node[1][1]:
+                best = node[1][0]
+        else:
+            if node[1] is not None:
+                return node[1][0][:limit]
+
+        if best is None:
+            return None
+        return [r for r in best if _matches(r, q)][:limit]
+
+
+class SuggestClient:
+    def __init__(self, index=BACKBONE_INDEX, max_entries: int = 5000):
+        self._lock = threading.Lock()
+        self._index = index
+        self._trie = PrefixTrie(max_entries)
+        self._served_from_trie = 0
+        self._served_from_index = 0
+
+    def available(self) -> bool:
+        return self._index.available()
+
+    def suggest(self, query: str, limit: int = 10) -> list:
+        """Suggestions for query; [] when no local index is installed."""
+        q = query.strip().lower()
+        if not q or not self.available():
+            return []
+
+        with self._lock:
+            cached = self._trie.lookup(q, limit)
+            if cached is not None:
+                self._served_from_trie += 1
+                return cached
+
+        results = [r for r in self._index.search(q, limit=limit) if _matches(r, q)]
+
+        with self._lock:
+            self._served_from_index += 1
+            # Fewer than `limit` hits means the index has nothing more for this prefix.
+            self._trie.insert(q, results, complete=len(results) < limit)
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "served_from_trie": self._served_from_trie,
+                "served_from_index": self._served_from_index,
+            }
+
+
+SUGGEST_CLIENT = SuggestClient(max_entries=config.GBIF_SUGGEST_CACHE_ENTRIES)
@@ -0,0 +1,244 @@
+# Local cache for featured animal images
+# Each remote image is downloaded once and stored as WebP variants sized
+# for their use (grid thumbnails, detail pages) under IMAGE_CACHE_DIR.
+# Files are content-addressed by URL, so they never change once written.
+#
+# Serving: with IMAGE_PROXY_PORT and IMAGE_PROXY_PUBLIC_URL set, a small
+# threaded HTTP server serves the cache directory with long-lived immutable
+# Cache-Control and ETag headers, and pages link to it directly. If this
+# process isn't serving (no public URL, or the port couldn't be bound),
+# pages fall back to the original image URL. With no proxy port, the
+# cached file path is handed to st.image, which serves it from the app's
+# own origin.
+#
+# A cold image is fetched in the background and the remote URL is used for
+# that one render; prewarm() fetches the whole featured set at startup.
+# A failed fetch is retried after IMAGE_FETCH_RETRY_SECONDS.
+
+import hashlib
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from PIL import Image, ImageOps
+
+import config
+from singleflight import SingleFlight
+
+VARIANTS = {
+    "thumb": config.IMAGE_THUMB_EDGE,
+    "detail": config.IMAGE_DETAIL_EDGE,
+}
+
+IMAGE_FLIGHTS = SingleFlight("images")
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    if img.mode in ("RGBA", "LA", "P"):
+        return img.convert("RGBA")
+    return img.convert("RGB")
+
+
+class ImageCache:
+    def __init__(self, cache_dir: str, quality: int = 80, workers: int = 8):
+        self._dir = cache_dir
+        self._quality = quality
+        self._session = requests.Session()
+        self._session.headers.update({"User-Agent": "global-animal-explorer"})
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="image-cache")
+        self._lock = threading.Lock()
+        self._failed = {}  # url -> time of the last failed fetch
+        self._pending = set()
+        self._prewarm_started = False
+        self._fetched = 0
+        self._errors = 0
+
+    def _name(self, url: str, variant: str) -> str:
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        return f"{digest}.{variant}.webp"
+
+    def path(self, url: str, variant: str) -> str:
+        return os.path.join(self._dir, self._name(url, variant))
+
+    def is_cached(self, url: str) -> bool:
+        return all(os.path.exists(self.path(url, v)) for v in VARIANTS)
+
+    def fetch(self, url: str) -> bool:
+        """Download url once and write every variant. Returns True when all are on disk."""
+        if self.is_cached(url):
+            return True
+        return IMAGE_FLIGHTS.do(url, lambda: self._fetch(url))
+
+    def _fetch(self, url: str) -> bool:
+        if self.is_cached(url):
+            return True
+        try:
+            r = self._session.get(url, timeout=config.IMAGE_FETCH_TIMEOUT)
+            r.raise_for_status()
+            source = ImageOps.exif_transpose(Image.open(io.BytesIO(r.content)))
+            source = _flatten(source)
+
+            os.makedirs(self._dir, exist_ok=True)
+            for variant, edge in VARIANTS.items():
+                img = source.copy()
+                img.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+                final = self.path(url, variant)
+                tmp = f"{final}.{os.getpid()}.{threading.get_ident()}.tmp"
+                img.save(tmp, format="WEBP", quality=self._quality, method=4)
+                os.replace(tmp, final)
+        except Exception:
+            with self._lock:
+                self._errors += 1
+                self._failed[url] = time.monotonic()
+            return False
+
+        with self._lock:
+            self._fetched += 1
+            self._failed.pop(url, None)
+        return True
+
+    def _fetch_in_background(self, url: str) -> None:
+        with self._lock:
+            if url in self._pending:
+                return
+            failed_at = self._failed.get(url)
+            if failed_at is not None and time.monotonic() - failed_at < config.IMAGE_FETCH_RETRY_SECONDS:
+                return
+            self._pending.add(url)
+
+        def run():
+            try:
+                self.fetch(url)
+            finally:
+                with self._lock:
+                    self._pending.discard(url)
+
+        self._executor.submit(run)
+
+    def src(self, url: str, variant: str = "thumb") -> str:
+        """
+        What to pass to st.image: the proxy URL or local path when cached,
+        otherwise the remote URL (and a background fetch is started).
+        """
+        if not url or not config.IMAGE_CACHE_ENABLED:
+            return url
+        if not self.is_cached(url):
+            self._fetch_in_background(url)
+            return url
+        if not config.IMAGE_PROXY_PORT:
+            return self.path(url, variant)
+        base = proxy_base_url()
+        if not base:
+            return url
+        return f"{base}/{self._name(url, variant)}"
+
+    def prewarm(self, urls) -> None:
+        """Fetch all urls in parallel in the background. Safe to call on every rerun."""
+        with self._lock:
+            if self._prewarm_started:
+                return
+            self._prewarm_started = True
+        for url in dict.fromkeys(u for u in urls if u):
+            if not self.is_cached(url):
+                self._fetch_in_background(url)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "fetched": self._fetched,
+                "errors": self._errors,
+                "pending": len(self._pending),
+            }
+
+
+# -----------------------------
+# Local proxy server
+# -----------------------------
+class _CacheHandler(BaseHTTPRequestHandler):
+    directory = ""
+
+    def do_GET(self):
+        name = os.path.basename(self.path.split("?", 1)[0])
+        path = os.path.join(self.directory, name)
+        if not name.endswith(".webp") or not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        # Names are content-addressed, so the name itself is a strong validator.
+        etag = f'"{name}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        with open(path, "rb") as f:
+            data = f.read()
+        self.send_response(200)
+        self.send_header("Content-Type", "image/webp")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", formatdate(os.path.getmtime(path), usegmt=True))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def proxy_base_url() -> str:
+    """Base URL for proxy links, or "" when this process isn't serving them."""
+    if not config.IMAGE_PROXY_PORT or not config.IMAGE_PROXY_PUBLIC_URL or not _server:
+        return ""
+    return config.IMAGE_PROXY_PUBLIC_URL.rstrip("/")
+
+
+def start_proxy() -> None:
+    """Serve IMAGE_CACHE_DIR on IMAGE_PROXY_PORT (once per process)."""
+    global _server
+    # Without a browser-facing URL nothing could link to the proxy.
+    if not config.IMAGE_PROXY_PORT or not config.IMAGE_PROXY_PUBLIC_URL:
+        return
+    with _server_lock:
+        if _server is not None:
+            return
+        _CacheHandler.directory = config.IMAGE_CACHE_DIR
+        os.makedirs(config.IMAGE_CACHE_DIR, exist_ok=True)
+        try:
+            server = ThreadingHTTPServer((config.IMAGE_PROXY_HOST, config.IMAGE_PROXY_PORT), _CacheHandler)
+        except OSError:
+            # Port taken, e.g. by another worker process serving the same directory.
+            server = None
+        if server is not None:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, name="image-proxy", daemon=True).start()
+            _server = server
+        else:
+            _server = False  # don't retry on every rerun; links use the original URLs
+
+
+IMAGE_CACHE = ImageCache(
+    config.IMAGE_CACHE_DIR,
+    quality=config.IMAGE_CACHE_QUALITY,
+    workers=config.IMAGE_PREWARM_WORKERS,
+)
+
+
+def start(urls) -> None:
+    """Start the proxy and pre-warm the cache. Safe to call on every rerun."""
+    if not config.IMAGE_CACHE_ENABLED:
+        return
+    start_proxy()
+    if config.IMAGE_PREWARM:
+        IMAGE_CACHE.prewarm(urls)
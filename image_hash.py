@@ -0,0 +1,267 @@
+# Perceptual image hashing + near-duplicate index
+# dHash survives resizing, recompression and EXIF stripping, which the
+# exact content hash in result_cache.py does not. A multi-index hash
+# table over past hashes finds earlier identifications within a
+# Hamming distance.
+#
+# Hashes are appended to a journal next to the disk result cache
+# (RESULT_CACHE_DIR/near_dup.jsonl) and replayed on first use, so
+# near-duplicates still hit after a restart. The journal is rewritten
+# without dropped and expired entries when it grows well past the index.
+
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: journal compaction is not coordinated
+    fcntl = None
+
+from PIL import Image, ImageOps
+
+import config
+
+HASH_BITS = 64
+
+
+def dhash(pil_image: Image.Image, size: int = 8) -> int:
+    """
+    Difference hash: shrink to (size+1) x size grayscale and record
+    whether each pixel is brighter than its right-hand neighbour.
+    EXIF orientation is applied first, so a stripped copy hashes the same.
+    """
+    upright = ImageOps.exif_transpose(pil_image)
+    small = upright.convert("L").resize(
+        (size + 1, size), Image.Resampling.BILINEAR, reducing_gap=2.0
+    )
+    pixels = list(small.getdata())
+
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class MultiIndexHash:
+    """
+    Hamming-distance index over 64-bit hashes (multi-index hashing).
+    Each hash is split into max_distance + 1 bit chunks; by pigeonhole,
+    any hash within max_distance matches at least one chunk exactly, so
+    a lookup only compares against a few bucket members instead of
+    walking the whole set. Entries are evicted oldest-first when full.
+    """
+
+    def __init__(self, max_distance: int = 4, max_entries: int = 200000):
+        self._max_distance = max(0, max_distance)
+        self._max_entries = max(1, max_entries)
+
+        chunks = min(self._max_distance + 1, HASH_BITS)
+        bounds = [round(i * HASH_BITS / chunks) for i in range(chunks + 1)]
+        self._chunks = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        self._tables = [{} for _ in self._chunks]
+        self._values = {}
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def _parts(self, h: int):
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            yield table, (h >> shift) & mask
+
+    def add(self, h: int, value) -> None:
+        if h in self._values:
+            # Re-adding refreshes the entry's position in eviction order.
+            del self._values[h]
+            self._values[h] = value
+            return
+
+        while len(self._values) >= self._max_entries:
+            self.remove(next(iter(self._values)))
+
+        self._values[h] = value
+        for table, part in self._parts(h):
+            table.setdefault(part, set()).add(h)
+
+    def remove(self, h: int) -> None:
+        if self._values.pop(h, None) is None:
+            return
+        for table, part in self._parts(h):
+            bucket = table.get(part)
+            if bucket is not None:
+                bucket.discard(h)
+                if not bucket:
+                    del table[part]
+
+    def search(self, h: int) -> list:
+        """All (distance, hash, value) within max_distance, nearest first."""
+        seen = set()
+        found = []
+        for table, part in self._parts(h):
+            for candidate in table.get(part, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                d = hamming(h, candidate)
+                if d <= self._max_distance:
+                    found.append((d, candidate, self._values[candidate]))
+
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def entries(self) -> list:
+        """(hash, value) for every entry, oldest first."""
+        return list(self._values.items())
+
+
+class _JournalLock:
+    """
+    Cross-process lock around the journal (a sidecar .lock file): appends
+    share it, compaction takes it exclusively so no append lands in a file
+    that is about to be replaced. No-op where fcntl is unavailable.
+    """
+
+    def __init__(self, path: str, exclusive: bool):
+        self._path = path + ".lock"
+        self._exclusive = exclusive
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._file = open(self._path, "a")
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX if self._exclusive else fcntl.LOCK_SH)
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            self._file.close()  # releases the lock
+
+
+class NearDuplicateIndex:
+    """
+    Thread-safe perceptual-hash index mapping images to result cache keys,
+    optionally persisted to a JSONL journal at `path` shared by all worker
+    processes. Entries older than ttl_seconds (the result cache TTL) are
+    not restored.
+    """
+
+    def __init__(self, max_distance: int = 4, max_entries: int = 200000, path: str = "",
+                 ttl_seconds: float = 7 * 24 * 3600):
+        self._lock = threading.Lock()
+        self._max_distance = max_distance
+        self._max_entries = max_entries
+        self._index = MultiIndexHash(max_distance=max_distance, max_entries=max_entries)
+        self._path = path
+        self._ttl = ttl_seconds
+        self._created = {}
+        self._loaded = not path
+        self._journal_lines = 0
+
+    # ---- journal ----
+    def _read_journal(self):
+        """(index, created, lines, torn) rebuilt from the journal; skips bad and expired lines."""
+        index = MultiIndexHash(max_distance=self._max_distance, max_entries=self._max_entries)
+        created_at = {}
+        lines = 0
+        torn = False
+        cutoff = time.time() - self._ttl
+        with open(self._path, encoding="utf-8") as f:
+            for line in f:
+                lines += 1
+                try:
+                    entry = json.loads(line)
+                    h, created, keys = int(entry["h"], 16), float(entry["created"]), dict(entry["keys"])
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    torn = True  # partial write from a crash, or not an entry
+                    continue
+                if created >= cutoff:
+                    index.add(h, keys)
+                    created_at[h] = created
+        return index, created_at, lines, torn
+
+    def _load(self) -> None:
+        """Replay the journal once (caller holds the lock)."""
+        self._loaded = True
+        try:
+            self._index, self._created, self._journal_lines, torn = self._read_journal()
+        except OSError:
+            return
+        # Rewrite a torn journal so the next append starts on a fresh line.
+        if torn or self._needs_compaction():
+            self._compact()
+
+    def _append(self, h: int, cache_keys: dict, created: float) -> None:
+        line = json.dumps({"h": format(h, "x"), "keys": cache_keys, "created": created})
+        try:
+            os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+            with _JournalLock(self._path, exclusive=False):
+                with open(self._path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except OSError:
+            return
+        self._journal_lines += 1
+        if self._needs_compaction():
+            self._compact()
+
+    def _needs_compaction(self) -> bool:
+        return self._journal_lines > 2 * len(self._index) + 1000
+
+    def _compact(self) -> None:
+        """
+        Rewrite the journal without dropped, expired and bad lines. It is
+        re-read under the exclusive lock, so entries other processes
+        appended are kept (and picked up by this process too).
+        """
+        tmp_path = f"{self._path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with _JournalLock(self._path, exclusive=True):
+                index, created_at, _, _ = self._read_journal()
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    for h, keys in index.entries():
+                        f.write(json.dumps({"h": format(h, "x"), "keys": keys,
+                                            "created": created_at[h]}) + "\n")
+                os.replace(tmp_path, self._path)
+        except OSError:
+            return
+        self._index, self._created = index, created_at
+        self._journal_lines = len(index)
+
+    # ---- public API ----
+    def add(self, h: int, cache_keys: dict) -> None:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            self._index.add(h, cache_keys)
+            if self._path:
+                created = time.time()
+                self._created[h] = created
+                self._append(h, cache_keys, created)
+
+    def lookup(self, h: int) -> list:
+        """Candidate (distance, cache_keys) pairs, nearest first."""
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            matches = self._index.search(h)
+        return [(d, keys) for d, _, keys in matches]
+
+    def __len__(self) -> int:
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            return len(self._index)
+
+
+NEAR_DUP_INDEX = NearDuplicateIndex(
+    max_distance=config.NEAR_DUP_MAX_DISTANCE,
+    max_entries=config.NEAR_DUP_MAX_ENTRIES,
+    path=os.path.join(config.RESULT_CACHE_DIR, "near_dup.jsonl") if config.RESULT_CACHE_DIR else "",
+    ttl_seconds=config.RESULT_CACHE_TTL_SECONDS,
+)
@@ -0,0 +1,76 @@
+# Image preprocessing before cloud vision calls
+# The vision model only needs ~1-2 megapixels, so uploads are
+# orientation-corrected, downsampled, stripped of metadata and re-encoded
+# before they go to OSS or into a base64 data URL.
+
+import io
+import time
+
+from PIL import Image, ImageOps
+
+import config
+
+FORMAT_INFO = {
+    "JPEG": ("jpg", "image/jpeg"),
+    "WEBP": ("webp", "image/webp"),
+}
+
+
+def _flatten_alpha(img: Image.Image) -> Image.Image:
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB")
+
+
+def prepare_image(
+    raw: bytes,
+    max_edge: int = None,
+    fmt: str = None,
+    quality: int = None,
+) -> dict:
+    """
+    Returns a dict with the bytes to send plus stats:
+    bytes, ext, mime, width, height, original_size, size, saved_bytes, seconds.
+    The re-encoded image is always used, even when it is not smaller: the
+    original bytes would still carry EXIF/GPS data and raw orientation.
+    """
+    max_edge = max_edge or config.IMAGE_MAX_EDGE
+    fmt = (fmt or config.IMAGE_FORMAT).upper()
+    quality = quality or config.IMAGE_QUALITY
+    if fmt not in FORMAT_INFO:
+        fmt = "JPEG"
+
+    started = time.perf_counter()
+
+    img = Image.open(io.BytesIO(raw))
+    original_format = img.format
+    if original_format == "JPEG":
+        # Let libjpeg decode at a reduced scale (1/2, 1/4, 1/8) when possible.
+        img.draft("RGB", (max_edge, max_edge))
+
+    img = ImageOps.exif_transpose(img)
+    img = _flatten_alpha(img)
+    img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        img.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(out, format="WEBP", quality=quality, method=4)
+    encoded = out.getvalue()
+
+    ext, mime = FORMAT_INFO[fmt]
+    return {
+        "bytes": encoded,
+        "ext": ext,
+        "mime": mime,
+        "width": img.width,
+        "height": img.height,
+        "original_size": len(raw),
+        "size": len(encoded),
+        "saved_bytes": len(raw) - len(encoded),
+        "seconds": time.perf_counter() - started,
+    }
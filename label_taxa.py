@@ -0,0 +1,268 @@
+# ImageNet label -> GBIF taxon lookup for offline predictions
+# The offline model's 1000 ImageNet classes are resolved to GBIF backbone
+# taxa once, by a build step, and stored in label_taxa.json. The table is
+# indexed by class index, since ImageNet reuses some label strings for
+# different classes ("crane" the bird and the machine). At request
+# time the table is read from disk (once per process), so local results
+# can carry taxon links, kingdom filtering and featured-animal matches
+# without any network calls.
+#
+# Build (needs network; labels come from torchvision or --labels):
+#   python label_taxa.py build [--labels labels.txt] [--workers 8]
+#   python label_taxa.py show 3        (class index or label)
+#
+# Only the organism classes are resolved (ORGANISM_RANGES); the rest are
+# objects whose labels often double as vernacular names ("mouse" the
+# device, "drum", "dock") and stay unmapped. Resolution, first hit wins:
+#   1. a fixed scientific name for label groups ImageNet splits into
+#      breeds (dogs, domestic cats), via /species/match
+#   2. a backbone taxon with this exact English vernacular name
+#   3. an exact /species/match on the label itself
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+
+FIELDS = ["key", "canonicalName", "rank", "kingdom", "phylum", "class", "order",
+          "family", "genus", "via"]
+
+# GBIF backbone taxonomy dataset
+BACKBONE_DATASET_KEY = "d7dddbf4-2cf0-4f39-9b2a-bb099caae36c"
+
+# ImageNet-1k class indexes that are organisms: animals (0-397) and
+# plants/fungi (984-998). Everything else is an object.
+ORGANISM_RANGES = [range(0, 398), range(984, 999)]
+
+# ImageNet-1k class index ranges that are breeds of one species.
+BREED_RANGES = [
+    (range(151, 269), "Canis lupus familiaris"),
+    (range(281, 286), "Felis catus"),
+]
+
+# Bump when the table layout changes; older files are ignored until rebuilt.
+TABLE_VERSION = 2
+
+RANK_ORDER = ["SUBSPECIES", "SPECIES", "GENUS", "FAMILY", "ORDER", "CLASS", "PHYLUM", "KINGDOM"]
+
+
+# -----------------------------
+# Build
+# -----------------------------
+def imagenet_labels() -> list:
+    """The offline model's category names, in class-index order (needs torchvision)."""
+    from torchvision import models
+
+    return list(models.MobileNet_V3_Large_Weights.DEFAULT.meta["categories"])
+
+
+def _taxon(record: dict, via: str) -> dict:
+    return {
+        "key": record.get("usageKey") or record.get("nubKey") or record.get("key"),
+        "canonicalName": record.get("canonicalName") or record.get("scientificName"),
+        "rank": record.get("rank"),
+        "kingdom": record.get("kingdom"),
+        "phylum": record.get("phylum"),
+        "class": record.get("class"),
+        "order": record.get("order"),
+        "family": record.get("family"),
+        "genus": record.get("genus"),
+        "via": via,
+    }
+
+
+def _exact_match(name: str, via: str):
+    import gbif_match
+
+    m = gbif_match.match_name(name)
+    if m.get("usageKey") and m.get("matchType") == "EXACT":
+        return _taxon(m, via)
+    return None
+
+
+def _vernacular_match(label: str):
+    import gbif_client
+
+    params = {
+        "q": label,
+        "qField": "VERNACULAR",
+        "datasetKey": BACKBONE_DATASET_KEY,
+        "status": "ACCEPTED",
+        "limit": 20,
+    }
+    data = gbif_client.cached_get_json(
+        "vernacular:" + json.dumps(params, sort_keys=True),
+        f"{config.GBIF_API_URL}/species/search",
+        params=params,
+        missing={"results": []},
+    )
+    wanted = label.lower()
+    hits = [
+        r for r in data.get("results", [])
+        if any((v.get("vernacularName") or "").lower() == wanted
+               for v in r.get("vernacularNames", []))
+    ]
+    if not hits:
+        return None
+    # Prefer animals, then the most specific rank.
+    hits.sort(key=lambda r: (
+        r.get("kingdom") != "Animalia",
+        RANK_ORDER.index(r["rank"]) if r.get("rank") in RANK_ORDER else len(RANK_ORDER),
+    ))
+    return _taxon(hits[0], "vernacular")
+
+
+def resolve_label(index: int, label: str):
+    """Taxon for ImageNet class `index`, or None for objects and unresolved labels."""
+    if not any(index in indexes for indexes in ORGANISM_RANGES):
+        return None
+    for indexes, scientific_name in BREED_RANGES:
+        if index in indexes:
+            return _exact_match(scientific_name, "breed")
+    return _vernacular_match(label) or _exact_match(label, "match")
+
+
+def build_table(labels: list, out_path: str, workers: int = 8, progress=None) -> dict:
+    """Resolve every label and write the table (replaced atomically)."""
+    started = time.perf_counter()
+    rows = [None] * len(labels)
+    done = [0]
+    lock = threading.Lock()
+
+    def task(i):
+        rows[i] = resolve_label(i, labels[i])
+        with lock:
+            done[0] += 1
+            if progress:
+                progress(done[0], len(labels))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # list() re-raises the first failure; a partial table is not written.
+        list(pool.map(task, range(len(labels))))
+
+    table = {
+        "version": TABLE_VERSION,
+        "built": int(time.time()),
+        "fields": FIELDS,
+        "labels": labels,
+        "taxa": [[row[f] for f in FIELDS] if row else None for row in rows],
+    }
+    directory = os.path.dirname(out_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(table, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, out_path)
+
+    resolved = sum(1 for row in rows if row)
+    return {"labels": len(labels), "resolved": resolved, "seconds": time.perf_counter() - started}
+
+
+# -----------------------------
+# Lookup
+# -----------------------------
+class LabelTaxa:
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = threading.Lock()
+        self._table = None
+        self._labels = []
+        self._fields = FIELDS
+        self._built = None
+
+    def _load(self) -> list:
+        if self._table is None:
+            with self._lock:
+                if self._table is None:
+                    table = []
+                    try:
+                        with open(self._path, encoding="utf-8") as f:
+                            data = json.load(f)
+                        if data.get("version") == TABLE_VERSION:
+                            self._fields = data.get("fields", FIELDS)
+                            self._built = data.get("built")
+                            self._labels = data.get("labels", [])
+                            table = data.get("taxa", [])
+                    except (OSError, ValueError):
+                        pass  # no table shipped: predictions stay plain labels
+                    self._table = table
+        return self._table
+
+    def available(self) -> bool:
+        return bool(self._load())
+
+    def version(self) -> str:
+        """Changes when the table is rebuilt; part of the offline result cache key."""
+        self._load()
+        return str(self._built or "none")
+
+    def lookup(self, index: int):
+        """Taxon dict for an ImageNet class index, or None (unknown or not an organism)."""
+        table = self._load()
+        row = table[index] if 0 <= index < len(table) else None
+        if not row:
+            return None
+        return dict(zip(self._fields, row))
+
+    def indexes(self, label: str) -> list:
+        """Class indexes whose label is `label` (usually one; a few labels repeat)."""
+        self._load()
+        return [i for i, name in enumerate(self._labels) if name == label]
+
+
+LABEL_TAXA = LabelTaxa(config.LABEL_TAXA_PATH)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="ImageNet label -> GBIF taxon table")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_build = sub.add_parser("build", help="Resolve all labels via the GBIF API")
+    p_build.add_argument("--labels", default=None, help="One label per line, in class-index order")
+    p_build.add_argument("--out", default=config.LABEL_TAXA_PATH)
+    p_build.add_argument("--workers", type=int, default=config.GBIF_MATCH_WORKERS)
+    p_build.add_argument("--api-url", default=None, help="Override GBIF_API_URL")
+
+    p_show = sub.add_parser("show", help="Look a class index or label up in the table")
+    p_show.add_argument("label", help="Class index, or a label (every class using it is shown)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "show":
+        if args.label.isdigit():
+            indexes = [int(args.label)]
+        else:
+            indexes = LABEL_TAXA.indexes(args.label)
+        print(json.dumps({i: LABEL_TAXA.lookup(i) for i in indexes}, indent=2))
+        return 0
+
+    if args.api_url:
+        config.GBIF_API_URL = args.api_url.rstrip("/")
+    if args.labels:
+        with open(args.labels, encoding="utf-8") as f:
+            labels = [line.strip() for line in f if line.strip()]
+    else:
+        labels = imagenet_labels()
+
+    counts = build_table(
+        labels,
+        args.out,
+        workers=args.workers,
+        progress=lambda n, total: print(f"\r{n}/{total} labels", end="", file=sys.stderr),
+    )
+    print(
+        f"\n{counts['resolved']}/{counts['labels']} labels resolved in "
+        f"{counts['seconds']:.0f} s -> {args.out}",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# Minimal local stand-in for the GBIF species API
+# Answers /species/match, /species/search (including qField=VERNACULAR),
+# /species/suggest and /species/{key} from a small built-in list, with an
+# optional artificial delay, so gbif_match.py, label_taxa.py and the app
+# can be exercised without network.
+#
+# Usage:
+#   python mock_gbif.py [--port 8765] [--delay 0.05]
+#   GBIF_API_URL=http://127.0.0.1:8765/v1 streamlit run app.py
+
+import argparse
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+TAXA = [
+    {"key": 5219404, "scientificName": "Panthera leo (Linnaeus, 1758)", "canonicalName": "Panthera leo",
+     "rank": "SPECIES", "genus": "Panthera", "family": "Felidae"},
+    {"key": 5219416, "scientificName": "Panthera tigris (Linnaeus, 1758)", "canonicalName": "Panthera tigris",
+     "rank": "SPECIES", "genus": "Panthera", "family": "Felidae"},
+    {"key": 2435099, "scientificName": "Puma concolor (Linnaeus, 1771)", "canonicalName": "Puma concolor",
+     "rank": "SPECIES", "genus": "Puma", "family": "Felidae"},
+    {"key": 2440447, "scientificName": "Ailuropoda melanoleuca (David, 1869)",
+     "canonicalName": "Ailuropoda melanoleuca", "rank": "SPECIES", "genus": "Ailuropoda", "family": "Ursidae"},
+    {"key": 2431950, "scientificName": "Ambystoma mexicanum (Shaw & Nodder, 1798)",
+     "canonicalName": "Ambystoma mexicanum", "rank": "SPECIES", "genus": "Ambystoma", "family": "Ambystomatidae"},
+    {"key": 5219173, "scientificName": "Panthera Oken, 1816", "canonicalName": "Panthera",
+     "rank": "GENUS", "genus": "Panthera", "family": "Felidae"},
+]
+VERNACULAR = {
+    5219404: ["lion"],
+    5219416: ["tiger"],
+    2435099: ["cougar", "puma"],
+    2440447: ["giant panda"],
+    2431950: ["axolotl"],
+}
+for _t in TAXA:
+    _t.update({"kingdom": "Animalia", "phylum": "Chordata", "taxonomicStatus": "ACCEPTED"})
+    _t["vernacularNames"] = [{"vernacularName": v, "language": "eng"} for v in VERNACULAR.get(_t["key"], [])]
+BY_KEY = {t["key"]: t for t in TAXA}
+
+
+def match(name: str) -> dict:
+    q = name.strip().lower()
+    for t in TAXA:
+        if t["canonicalName"].lower() == q or t["scientificName"].lower() == q:
+            return {**t, "usageKey": t["key"], "status": "ACCEPTED", "confidence": 99, "matchType": "EXACT"}
+    for t in TAXA:
+        if t["canonicalName"].lower().startswith(q.split(" ")[0]) and t["rank"] == "GENUS":
+            return {**t, "usageKey": t["key"], "status": "ACCEPTED", "confidence": 90,
+                    "matchType": "HIGHERRANK"}
+    return {"confidence": 100, "matchType": "NONE", "synonym": False}
+
+
+def search(q: str, vernacular: bool = False) -> list:
+    q = q.strip().lower()
+    if vernacular:
+        return [t for t in TAXA if any(q in v["vernacularName"] for v in t["vernacularNames"])]
+    return [t for t in TAXA if q in t["canonicalName"].lower()]
+
+
+class Handler(BaseHTTPRequestHandler):
+    delay = 0.0
+
+    def _send(self, status: int, body) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.delay:
+            time.sleep(self.delay)
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = url.path.rstrip("/")
+        if path.startswith("/v1"):
+            path = path[3:]
+
+        if path == "/species/match":
+            return self._send(200, match(params.get("name", "")))
+        if path == "/species/suggest":
+            return self._send(200, search(params.get("q", ""))[: int(params.get("limit", 10))])
+        if path == "/species/search":
+            hits = search(params.get("q", ""), vernacular=params.get("qField") == "VERNACULAR")
+            offset, limit = int(params.get("offset", 0)), int(params.get("limit", 20))
+            return self._send(200, {
+                "offset": offset,
+                "limit": limit,
+                "endOfRecords": offset + limit >= len(hits),
+                "count": len(hits),
+                "results": hits[offset:offset + limit],
+            })
+        if path.startswith("/species/"):
+            try:
+                taxon = BY_KEY.get(int(path.rsplit("/", 1)[1]))
+            except ValueError:
+                taxon = None
+            if taxon is not None:
+                return self._send(200, taxon)
+        return self._send(404, {"error": "not found"})
+
+    def log_message(self, fmt, *args):
+        pass  # keep batch runs quiet
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Local mock of the GBIF species API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds added to every response")
+    args = parser.parse_args(argv)
+
+    Handler.delay = args.delay
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    print(f"Mock GBIF API on http://{args.host}:{args.port}/v1", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
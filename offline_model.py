@@ -0,0 +1,395 @@
+# Offline model registry
+# Keeps one MobileNetV3 model + preprocessing pipeline per process.
+# Loading starts in a background thread when the app starts, so uploads
+# only pay for the forward pass.
+#
+# The forward pass runs on the fastest available inference engine:
+#   onnx      -> ONNX Runtime (optionally int8-quantized), exported once
+#   quantized -> dynamic int8 quantization of the torch model
+#   torch     -> plain fp32 eager PyTorch
+# Exported artifacts are cached under config.OFFLINE_MODEL_DIR.
+#
+# Concurrent sessions share the engine through a micro-batcher that
+# groups pending images into one batched forward pass.
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import config
+
+STATE_IDLE = "idle"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+ENGINE_ORDER = ["onnx", "quantized", "torch"]
+MODEL_NAME = "mobilenet_v3_large"
+ARTIFACT_STEM = MODEL_NAME
+
+
+# -----------------------------
+# Inference engines
+# -----------------------------
+class TorchEngine:
+    name = "torch"
+
+    def __init__(self, model):
+        self._model = model
+
+    def run(self, batch):
+        import torch
+
+        with torch.no_grad():
+            return self._model(batch)
+
+
+class QuantizedTorchEngine(TorchEngine):
+    name = "quantized"
+
+    @classmethod
+    def build(cls, model, artifact_dir: str):
+        import torch
+
+        path = os.path.join(artifact_dir, f"{ARTIFACT_STEM}.qdyn.pt")
+        if os.path.exists(path):
+            return cls(torch.jit.load(path))
+
+        qmodel = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        example = torch.zeros(1, 3, 224, 224)
+        with torch.no_grad():
+            traced = torch.jit.trace(qmodel, example)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.jit.save(traced, tmp_path)
+        os.replace(tmp_path, path)
+        return cls(traced)
+
+
+class OnnxEngine:
+    name = "onnx"
+
+    def __init__(self, session):
+        self._session = session
+        self._input_name = session.get_inputs()[0].name
+
+    def run(self, batch):
+        import torch
+
+        out = self._session.run(None, {self._input_name: batch.numpy()})[0]
+        return torch.from_numpy(out)
+
+    @classmethod
+    def build(cls, model, artifact_dir: str):
+        import onnxruntime as ort
+        import torch
+
+        path = os.path.join(artifact_dir, f"{ARTIFACT_STEM}.onnx")
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            torch.onnx.export(
+                model,
+                torch.zeros(1, 3, 224, 224),
+                tmp_path,
+                input_names=["input"],
+                output_names=["logits"],
+                dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
+                opset_version=17,
+            )
+            os.replace(tmp_path, path)
+
+        if config.OFFLINE_ONNX_INT8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            int8_path = os.path.join(artifact_dir, f"{ARTIFACT_STEM}.int8.onnx")
+            if not os.path.exists(int8_path):
+                tmp_path = f"{int8_path}.{os.getpid()}.tmp"
+                quantize_dynamic(path, tmp_path, weight_type=QuantType.QInt8)
+                os.replace(tmp_path, int8_path)
+            path = int8_path
+
+        opts = ort.SessionOptions()
+        if config.OFFLINE_INTRA_OP_THREADS > 0:
+            opts.intra_op_num_threads = config.OFFLINE_INTRA_OP_THREADS
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        session = ort.InferenceSession(
+            path, sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        return cls(session)
+
+
+def verify_engine(engine, reference, tolerance: float) -> float:
+    """
+    Compare an engine's softmax output with the fp32 reference on a fixed
+    input. Returns the max absolute probability difference; raises
+    RuntimeError if it exceeds the tolerance or the top-5 order differs.
+    """
+    import torch
+
+    gen = torch.Generator().manual_seed(0)
+    batch = torch.randn(4, 3, 224, 224, generator=gen)
+
+    expected = torch.softmax(reference.run(batch), dim=1)
+    actual = torch.softmax(engine.run(batch), dim=1)
+
+    diff = float((expected - actual).abs().max())
+    same_top5 = torch.equal(
+        torch.topk(expected, k=5).indices, torch.topk(actual, k=5).indices
+    )
+    if diff > tolerance or not same_top5:
+        raise RuntimeError(
+            f"{engine.name} engine disagrees with fp32 "
+            f"(max prob diff {diff:.4f}, top-5 match: {same_top5})."
+        )
+    return diff
+
+
+def _engine_candidates() -> list:
+    wanted = (config.OFFLINE_ENGINE or "auto").lower()
+    if wanted == "auto":
+        return list(ENGINE_ORDER)
+    # An explicit choice still falls back to plain torch if it can't load.
+    return [wanted] if wanted == "torch" else [wanted, "torch"]
+
+
+def select_engine(model):
+    """Return (engine, max_prob_diff) for the first engine that loads and verifies."""
+    reference = TorchEngine(model)
+    builders = {
+        "onnx": OnnxEngine.build,
+        "quantized": QuantizedTorchEngine.build,
+    }
+
+    for name in _engine_candidates():
+        if name == "torch":
+            return reference, 0.0
+        if name not in builders:
+            continue
+        try:
+            os.makedirs(config.OFFLINE_MODEL_DIR, exist_ok=True)
+            engine = builders[name](model, config.OFFLINE_MODEL_DIR)
+            diff = verify_engine(engine, reference, config.OFFLINE_ENGINE_TOLERANCE)
+            return engine, diff
+        except Exception:
+            continue
+
+    return reference, 0.0
+
+
+# -----------------------------
+# Registry
+# -----------------------------
+class ModelRegistry:
+    """
+    Thread-safe, load-once holder for the offline classifier.
+    torch/torchvision are imported lazily, so the app still starts
+    on deployments where they are not installed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = threading.Event()
+        self._thread = None
+        self._state = STATE_IDLE
+        self._error = ""
+        self._load_seconds = None
+        self._engine = None
+        self._engine_diff = None
+        self._preprocess = None
+        self._categories = []
+
+    def _load(self):
+        started = time.perf_counter()
+        try:
+            import torch
+            from torchvision import models
+
+            if config.OFFLINE_INTRA_OP_THREADS > 0:
+                torch.set_num_threads(config.OFFLINE_INTRA_OP_THREADS)
+
+            weights = models.MobileNet_V3_Large_Weights.DEFAULT
+            model = models.mobilenet_v3_large(weights=weights)
+            model.eval()
+
+            engine, diff = select_engine(model)
+
+            with self._lock:
+                self._engine = engine
+                self._engine_diff = diff
+                self._preprocess = weights.transforms()
+                self._categories = list(weights.meta.get("categories", []))
+                self._state = STATE_READY
+        except Exception as e:
+            with self._lock:
+                self._state = STATE_FAILED
+                self._error = str(e)
+        finally:
+            with self._lock:
+                self._load_seconds = time.perf_counter() - started
+            self._loaded.set()
+
+    def start_warmup(self) -> None:
+        """Start loading in the background. Safe to call on every rerun."""
+        with self._lock:
+            if self._state != STATE_IDLE:
+                return
+            self._state = STATE_LOADING
+            self._thread = threading.Thread(
+                target=self._load, name="offline-model-warmup", daemon=True
+            )
+            self._thread.start()
+
+    def get(self, timeout=None):
+        """
+        Return (engine, preprocess, categories), waiting for a load
+        in progress. Raises RuntimeError if the model is unavailable.
+        """
+        self.start_warmup()
+        if not self._loaded.wait(timeout):
+            raise RuntimeError("Offline model is still loading.")
+
+        with self._lock:
+            if self._state != STATE_READY:
+                raise RuntimeError(self._error or "Offline model failed to load.")
+            return self._engine, self._preprocess, self._categories
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._state,
+                "load_seconds": self._load_seconds,
+                "engine": self._engine.name if self._engine else None,
+                "engine_max_prob_diff": self._engine_diff,
+                "error": self._error,
+            }
+
+
+MODEL_REGISTRY = ModelRegistry()
+
+
+def start_warmup() -> None:
+    if config.OFFLINE_MODEL_WARMUP:
+        MODEL_REGISTRY.start_warmup()
+
+
+def model_status() -> dict:
+    return MODEL_REGISTRY.status()
+
+
+# -----------------------------
+# Micro-batching
+# -----------------------------
+def _topk_labels(probs, categories, k: int) -> list:
+    import torch
+
+    topk = torch.topk(probs, k=k)
+    preds = []
+    for score, idx in zip(topk.values.tolist(), topk.indices.tolist()):
+        label = categories[idx] if idx < len(categories) else f"class_{idx}"
+        preds.append((label, score, idx))
+    return preds
+
+
+class InferenceBatcher:
+    """
+    Collects preprocessed images for up to max_wait_ms (or max_batch
+    items), runs one batched forward pass and resolves each caller's
+    Future with its own top-k list.
+    """
+
+    def __init__(self, registry: ModelRegistry, max_batch: int, max_wait_ms: float):
+        self._registry = registry
+        self._max_batch = max(1, max_batch)
+        self._max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._batches = 0
+        self._images = 0
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._worker, name="offline-model-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, tensor, k: int = 5) -> Future:
+        fut = Future()
+        self._queue.put((tensor, k, fut))
+        self._ensure_worker()
+        return fut
+
+    def _collect(self) -> list:
+        items = [self._queue.get()]
+        deadline = time.perf_counter() + self._max_wait
+        while len(items) < self._max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _worker(self):
+        import torch
+
+        while True:
+            items = self._collect()
+            items = [item for item in items if item[2].set_running_or_notify_cancel()]
+            if not items:
+                continue
+
+            try:
+                engine, _, categories = self._registry.get()
+                batch = torch.stack([tensor for tensor, _, _ in items])
+                probs = torch.softmax(engine.run(batch), dim=1)
+
+                for row, (_, k, fut) in zip(probs, items):
+                    fut.set_result(_topk_labels(row, categories, k))
+
+                with self._lock:
+                    self._batches += 1
+                    self._images += len(items)
+            except Exception as e:
+                for _, _, fut in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "batches": self._batches,
+                "images": self._images,
+                "avg_batch_size": (self._images / self._batches) if self._batches else 0.0,
+            }
+
+
+BATCHER = InferenceBatcher(
+    MODEL_REGISTRY,
+    max_batch=config.OFFLINE_BATCH_MAX_SIZE,
+    max_wait_ms=config.OFFLINE_BATCH_MAX_WAIT_MS,
+)
+
+
+def classify(pil_image, k: int = 5, timeout=None) -> list:
+    """Top-k (label, probability, class index) triples for one image."""
+    import torch
+
+    engine, preprocess, categories = MODEL_REGISTRY.get(timeout)
+
+    # Preprocessing stays on the caller's thread; only the forward pass is shared.
+    tensor = preprocess(pil_image.convert("RGB"))
+
+    if config.OFFLINE_BATCHING:
+        return BATCHER.submit(tensor, k=k).result(timeout)
+
+    probs = torch.softmax(engine.run(tensor.unsqueeze(0)), dim=1)[0]
+    return _topk_labels(probs, categories, k)
@@ -0,0 +1,103 @@
+# Alibaba Cloud OSS image store (optional)
+# Uploads straight from memory through one long-lived client. Objects are
+# named by content hash, so an image that is already stored costs a HEAD
+# request instead of a re-upload. Large payloads use multipart upload.
+#
+# Point OSS_ENDPOINT at a local OSS/S3-compatible stand-in (with
+# OSS_USE_PATH_STYLE=1 and OSS_PUBLIC_BASE_URL) to test without a bucket.
+
+import hashlib
+import io
+import threading
+
+import config
+
+OSS_AVAILABLE = True
+try:
+    import alibabacloud_oss_v2 as oss
+except Exception:
+    OSS_AVAILABLE = False
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def is_configured() -> bool:
+    if not OSS_AVAILABLE:
+        return False
+
+    required = [
+        config.OSS_ACCESS_KEY_ID,
+        config.OSS_ACCESS_KEY_SECRET,
+        config.OSS_REGION,
+        config.OSS_ENDPOINT,
+        config.OSS_BUCKET,
+    ]
+    return all(bool(x) for x in required)
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            cfg = oss.config.load_default()
+            cfg.credentials_provider = oss.credentials.StaticCredentialsProvider(
+                access_key_id=config.OSS_ACCESS_KEY_ID,
+                access_key_secret=config.OSS_ACCESS_KEY_SECRET
+            )
+            cfg.region = config.OSS_REGION
+            cfg.endpoint = config.OSS_ENDPOINT
+            if config.OSS_USE_PATH_STYLE:
+                cfg.use_path_style = True
+            _client = oss.Client(cfg)
+        return _client
+
+
+def content_object_name(file_bytes: bytes, ext: str, prefix: str = "animal-images") -> str:
+    digest = hashlib.sha256(file_bytes).hexdigest()
+    return f"{prefix}/{digest[:2]}/{digest}.{ext}"
+
+
+def public_url(object_name: str) -> str:
+    if config.OSS_PUBLIC_BASE_URL:
+        return f"{config.OSS_PUBLIC_BASE_URL.rstrip('/')}/{object_name}"
+    return f"https://{config.OSS_BUCKET}.{config.OSS_ENDPOINT}/{object_name}"
+
+
+def upload_bytes(file_bytes: bytes, object_name: str) -> dict:
+    """
+    Returns {"success", "url", "etag", "deduplicated"} or {"success": False, "error"}.
+    """
+    if not OSS_AVAILABLE:
+        return {"success": False, "error": "OSS library not available."}
+
+    try:
+        client = get_client()
+
+        if client.is_object_exist(bucket=config.OSS_BUCKET, key=object_name):
+            return {
+                "success": True,
+                "url": public_url(object_name),
+                "etag": None,
+                "deduplicated": True,
+            }
+
+        request = oss.PutObjectRequest(bucket=config.OSS_BUCKET, key=object_name)
+        if len(file_bytes) >= config.OSS_MULTIPART_THRESHOLD:
+            uploader = client.uploader(
+                part_size=config.OSS_MULTIPART_PART_SIZE,
+                parallel_num=config.OSS_MULTIPART_PARALLEL,
+            )
+            result = uploader.upload_from(request, io.BytesIO(file_bytes))
+        else:
+            request.body = file_bytes
+            result = client.put_object(request)
+
+        return {
+            "success": True,
+            "url": public_url(object_name),
+            "etag": getattr(result, "etag", None),
+            "deduplicated": False,
+        }
+    except Exception as e:
+        return {"success": False, "error": str(e)}
@@ -0,0 +1,199 @@
+# DashScope request scheduler
+# Keeps cloud calls inside a requests-per-minute and tokens-per-minute
+# budget. Callers wait in a bounded priority queue (interactive uploads
+# ahead of background work such as prefetch_cloud_result in app.py; FIFO
+# within a priority), and 429/5xx responses are retried with jittered
+# exponential backoff, each attempt taking a fresh slot from the budget.
+
+import heapq
+import itertools
+import random
+import threading
+import time
+
+import config
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+class RateLimitQueueFull(RuntimeError):
+    pass
+
+
+class RateLimitTimeout(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 per second, up to capacity."""
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.per_minute = per_minute
+        self.capacity = capacity if capacity is not None else per_minute
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.per_minute <= 0
+
+    def _refill(self, now: float) -> None:
+        rate = self.per_minute / 60.0
+        self._level = min(self.capacity, self._level + (now - self._updated) * rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is available now)."""
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        # Requests bigger than the bucket only need a full bucket.
+        amount = min(amount, self.capacity)
+        if self._level >= amount:
+            return 0.0
+        return (amount - self._level) / (self.per_minute / 60.0)
+
+    def take(self, amount: float) -> None:
+        if not self.unlimited:
+            self._level -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Debit (delta > 0) or credit (delta < 0) after the real cost is known."""
+        if not self.unlimited:
+            self._level = min(self.capacity, self._level - delta)
+
+
+class CloudScheduler:
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_queue: int = 64,
+    ):
+        self._cond = threading.Condition()
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._max_queue = max(1, max_queue)
+        self._heap = []
+        self._seq = itertools.count()
+        self._granted = 0
+        self._rejected = 0
+        self._retries = 0
+
+    def acquire(self, priority: int = PRIORITY_INTERACTIVE, tokens: int = 0, timeout: float = None) -> None:
+        """
+        Block until this caller is first in line and both budgets allow it.
+        Raises RateLimitQueueFull or RateLimitTimeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ticket = (priority, next(self._seq))
+
+        with self._cond:
+            if len(self._heap) >= self._max_queue:
+                self._rejected += 1
+                raise RateLimitQueueFull("Cloud request queue is full.")
+            heapq.heappush(self._heap, ticket)
+
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None
+                    if self._heap[0] == ticket:
+                        wait = max(
+                            self._requests.wait_time(1, now),
+                            self._tokens.wait_time(tokens, now),
+                        )
+                        if wait <= 0:
+                            heapq.heappop(self._heap)
+                            self._requests.take(1)
+                            self._tokens.take(tokens)
+                            self._granted += 1
+                            self._cond.notify_all()
+                            return
+
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            raise RateLimitTimeout("Timed out waiting for cloud quota.")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            except BaseException:
+                if ticket in self._heap:
+                    self._heap.remove(ticket)
+                    heapq.heapify(self._heap)
+                    self._cond.notify_all()
+                raise
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: int) -> None:
+        with self._cond:
+            self._tokens.adjust(actual_tokens - estimated_tokens)
+
+    def note_retry(self) -> None:
+        with self._cond:
+            self._retries += 1
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "queued": len(self._heap),
+                "granted": self._granted,
+                "rejected": self._rejected,
+                "retries": self._retries,
+            }
+
+
+CLOUD_SCHEDULER = CloudScheduler(
+    requests_per_minute=config.CLOUD_REQUESTS_PER_MINUTE,
+    tokens_per_minute=config.CLOUD_TOKENS_PER_MINUTE,
+    max_queue=config.CLOUD_MAX_QUEUE,
+)
+
+
+def backoff_delay(attempt: int, base: float, cap: float, retry_after: float = None) -> float:
+    """Full-jitter exponential backoff, never shorter than a server Retry-After."""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def retry_after_seconds(exc: Exception):
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def call_scheduled(
+    fn,
+    is_retryable,
+    priority: int = PRIORITY_INTERACTIVE,
+    tokens: int = 0,
+    scheduler: CloudScheduler = None,
+):
+    """
+    Run fn() under the scheduler, retrying when is_retryable(exc) is true.
+    Each attempt waits for its own slot, so retries stay inside the budget.
+    """
+    scheduler = scheduler or CLOUD_SCHEDULER
+    attempt = 0
+    while True:
+        scheduler.acquire(priority=priority, tokens=tokens, timeout=config.CLOUD_QUEUE_TIMEOUT)
+        try:
+            return fn()
+        except Exception as e:
+            if attempt >= config.CLOUD_RETRIES or not is_retryable(e):
+                raise
+            scheduler.note_retry()
+            time.sleep(
+                backoff_delay(
+                    attempt,
+                    config.CLOUD_BACKOFF_BASE_SECONDS,
+                    config.CLOUD_BACKOFF_MAX_SECONDS,
+                    retry_after_seconds(e),
+                )
+            )
+            attempt += 1
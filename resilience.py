@@ -0,0 +1,162 @@
+# Resilience helpers for cloud calls
+# - CircuitBreaker: skip DashScope for a cool-down after repeated failures
+# - run_hedged: start a fallback once the primary call passes a latency
+#   budget and return whichever succeeds first (by priority)
+#
+# Primary (cloud) calls and fallbacks run on separate pools: slow or
+# abandoned cloud calls can hold a worker for the whole read timeout, and
+# must not queue the local fallback behind them when the cloud is slow.
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import config
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    closed    -> calls go through; consecutive failures are counted
+    open      -> calls are skipped until cooldown_seconds have passed
+    half_open -> a single trial call decides between closed and open
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown_seconds: float = 60):
+        self._lock = threading.Lock()
+        self._failure_threshold = max(1, failure_threshold)
+        self._cooldown = cooldown_seconds
+        self._state = BREAKER_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._skipped = 0
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == BREAKER_CLOSED:
+                return True
+            if self._state == BREAKER_OPEN:
+                if time.monotonic() - self._opened_at < self._cooldown:
+                    self._skipped += 1
+                    return False
+                self._state = BREAKER_HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                self._skipped += 1
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = BREAKER_CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == BREAKER_HALF_OPEN or self._failures >= self._failure_threshold:
+                self._state = BREAKER_OPEN
+                self._opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """
+        End a call that neither succeeded nor failed (local back-pressure,
+        cancellation). Counts nothing; in half_open the next call may try.
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_error(self, service_failure: bool) -> None:
+        """
+        A call raised. Service failures count against the breaker; caller
+        errors (bad key, bad request) say nothing about the service's
+        health, so they neither close a half-open breaker nor reset the
+        failure count.
+        """
+        if service_failure:
+            self.record_failure()
+        else:
+            self.release_trial()
+
+    def status(self) -> dict:
+        with self._lock:
+            remaining = 0.0
+            if self._state == BREAKER_OPEN:
+                remaining = max(0.0, self._cooldown - (time.monotonic() - self._opened_at))
+            return {
+                "state": self._state,
+                "failures": self._failures,
+                "skipped": self._skipped,
+                "cooldown_remaining": remaining,
+            }
+
+
+CLOUD_BREAKER = CircuitBreaker(
+    failure_threshold=config.CLOUD_BREAKER_FAILURES,
+    cooldown_seconds=config.CLOUD_BREAKER_COOLDOWN_SECONDS,
+)
+
+# Shared by all sessions; abandoned calls finish in the background.
+HEDGE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=config.HEDGE_MAX_WORKERS, thread_name_prefix="hedge"
+)
+# Fallbacks (the local model) only; never blocked by cloud calls.
+FALLBACK_EXECUTOR = ThreadPoolExecutor(
+    max_workers=config.HEDGE_FALLBACK_WORKERS, thread_name_prefix="hedge-fallback"
+)
+
+
+def run_hedged(calls: list, budget_seconds: float):
+    """
+    calls: [(name, fn), ...] in priority order. The first call starts
+    immediately on HEDGE_EXECUTOR; each later one starts on
+    FALLBACK_EXECUTOR when the previous has been running
+    for budget_seconds without a usable result (budget 0 starts all at
+    once). A result is usable if it is truthy.
+
+    Returns (name, result) of the highest-priority call that has succeeded
+    at the moment a winner is known, or (None, None) if every call failed.
+    """
+    pending = {}
+    results = {}
+    remaining = list(calls)
+
+    def launch():
+        executor = HEDGE_EXECUTOR if len(remaining) == len(calls) else FALLBACK_EXECUTOR
+        name, fn = remaining.pop(0)
+        pending[executor.submit(fn)] = name
+
+    launch()
+    while remaining and budget_seconds <= 0:
+        launch()
+
+    while pending:
+        timeout = budget_seconds if remaining else None
+        done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+
+        for fut in done:
+            name = pending.pop(fut)
+            try:
+                value = fut.result()
+            except Exception:
+                value = None
+            if value:
+                results[name] = value
+
+        if results:
+            for name, _ in calls:
+                if name in results:
+                    return name, results[name]
+
+        # Budget elapsed with nothing usable, or a call failed: start the next one.
+        if remaining and (not done or not pending):
+            launch()
+
+    return None, None
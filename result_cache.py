@@ -0,0 +1,168 @@
+# Identification result cache
+# Content-addressed: the key is a hash of the image bytes plus the model
+# name and prompt version, so a re-uploaded photo skips OSS upload,
+# base64 encoding and the model call entirely.
+#
+# Two tiers:
+#   memory -> size-bounded LRU, per process
+#   disk   -> one JSON file per entry under config.RESULT_CACHE_DIR (optional)
+# Both tiers honour the same TTL.
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+
+def cache_key(image_bytes: bytes, model: str, prompt_version: str) -> str:
+    h = hashlib.sha256()
+    h.update(image_bytes)
+    h.update(b"\0")
+    h.update(model.encode("utf-8"))
+    h.update(b"\0")
+    h.update(prompt_version.encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 7 * 24 * 3600,
+        disk_dir: str = "",
+        disk_max_entries: int = 10000,
+    ):
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl_seconds
+        self._disk_dir = disk_dir
+        self._disk_max_entries = max(1, disk_max_entries)
+        self._disk_writes = 0
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+    # ---- disk tier ----
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self._disk_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key: str):
+        if not self._disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get("created", 0) > self._ttl:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def _disk_put(self, key: str, entry: dict) -> None:
+        if not self._disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+
+        self._disk_writes += 1
+        # Scanning the directory is not free; only prune every so often.
+        if self._disk_writes % 100 == 0:
+            self.prune_disk()
+
+    def prune_disk(self) -> int:
+        """Drop expired files, then the oldest ones beyond disk_max_entries."""
+        if not self._disk_dir or not os.path.isdir(self._disk_dir):
+            return 0
+
+        now = time.time()
+        files = []
+        for root, _, names in os.walk(self._disk_dir):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        files.append((os.path.getmtime(path), path))
+                    except OSError:
+                        pass
+
+        files.sort()
+        expired = [p for mtime, p in files if now - mtime > self._ttl]
+        alive = [p for mtime, p in files if now - mtime <= self._ttl]
+        overflow = alive[: max(0, len(alive) - self._disk_max_entries)]
+
+        removed = 0
+        for path in expired + overflow:
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    # ---- public API ----
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry["created"] <= self._ttl:
+                    self._memory.move_to_end(key)
+                    self._hits += 1
+                    return entry["text"]
+                del self._memory[key]
+
+        entry = self._disk_get(key)
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                return None
+            self._disk_hits += 1
+            self._store_memory(key, entry)
+        return entry["text"]
+
+    def put(self, key: str, text: str) -> None:
+        entry = {"created": time.time(), "text": text}
+        with self._lock:
+            self._store_memory(key, entry)
+        self._disk_put(key, entry)
+
+    def _store_memory(self, key: str, entry: dict) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._memory),
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+            }
+
+
+RESULT_CACHE = ResultCache(
+    max_entries=config.RESULT_CACHE_MAX_ENTRIES,
+    ttl_seconds=config.RESULT_CACHE_TTL_SECONDS,
+    disk_dir=config.RESULT_CACHE_DIR,
+    disk_max_entries=config.RESULT_CACHE_DISK_MAX_ENTRIES,
+)
@@ -0,0 +1,67 @@
+# Single-flight request coalescing
+# Concurrent callers asking for the same key share one in-flight call:
+# the first caller runs it, the rest wait and get the same result (or
+# exception). Prevents cache stampedes when many sessions ask at once.
+
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._executed = 0
+        self._shared = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._shared += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "executed": self._executed,
+                "saved": self._shared,
+                "in_flight": len(self._calls),
+            }
+
+
+GBIF_FLIGHTS = SingleFlight("gbif")
+CLOUD_FLIGHTS = SingleFlight("cloud")
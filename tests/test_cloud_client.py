@@ -0,0 +1,64 @@
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("openai")
+
+import cloud_client  # noqa: E402
+
+BASE_URL = "https://example.invalid/v1"
+
+
+class FakeClient:
+    def __init__(self, api_key):
+        self.api_key = api_key
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakePool(cloud_client.ClientPool):
+    def _build(self, api_key, base_url):
+        return FakeClient(api_key)
+
+
+def test_clients_are_shared_per_key():
+    pool = FakePool()
+    with pool.lease("key-a", BASE_URL) as first:
+        with pool.lease("key-a", BASE_URL) as second:
+            assert first is second
+    assert pool.stats()["created"] == 1
+    assert pool.stats()["reused"] == 1
+
+
+def test_discard_waits_for_the_last_lease():
+    pool = FakePool()
+    with pool.lease("key-a", BASE_URL) as client:
+        with pool.lease("key-a", BASE_URL):
+            pool.discard("key-a", BASE_URL)
+            assert not client.closed
+        assert not client.closed
+    assert client.closed
+    assert pool.stats()["retired"] == 0
+
+    # The next lease for the key gets a fresh client.
+    with pool.lease("key-a", BASE_URL) as fresh:
+        assert fresh is not client
+
+
+def test_overflow_eviction_does_not_close_a_client_in_use():
+    pool = FakePool(max_clients=1)
+    with pool.lease("key-a", BASE_URL) as busy:
+        with pool.lease("key-b", BASE_URL):
+            assert not busy.closed
+        assert not busy.closed
+    assert busy.closed
+
+
+def test_idle_clients_are_closed_when_evicted():
+    pool = FakePool(idle_seconds=0)
+    with pool.lease("key-a", BASE_URL) as idle:
+        pass
+    with pool.lease("key-b", BASE_URL):
+        assert idle.closed
+    assert pool.stats()["clients"] == 1
@@ -0,0 +1,96 @@
+import sqlite3
+import zipfile
+
+import pytest
+
+import gbif_backbone
+from gbif_backbone import BackboneIndex, import_backbone
+
+TAXON_HEADER = [
+    "taxonID", "scientificName", "canonicalName", "taxonRank", "taxonomicStatus",
+    "acceptedNameUsageID", "kingdom", "phylum", "class", "order", "family", "genus",
+]
+
+TAXA = [
+    ["5219404", "Panthera leo (Linnaeus, 1758)", "Panthera leo", "species", "accepted", "",
+     "Animalia", "Chordata", "Mammalia", "Carnivora", "Felidae", "Panthera"],
+    ["5219416", "Panthera tigris (Linnaeus, 1758)", "Panthera tigris", "species", "accepted", "",
+     "Animalia", "Chordata", "Mammalia", "Carnivora", "Felidae", "Panthera"],
+    ["2435099", "Puma concolor (Linnaeus, 1771)", "Puma concolor", "species", "accepted", "",
+     "Animalia", "Chordata", "Mammalia", "Carnivora", "Felidae", "Puma"],
+]
+
+VERNACULAR = [
+    ["5219404", "Lion", "en"],
+    ["5219416", "Tiger", "en"],
+    ["2435099", "Mountain lion", "en"],
+    ["2435099", "Puma", "de"],
+]
+
+
+def tsv(header, rows):
+    return "\n".join("\t".join(r) for r in [header, *rows]) + "\n"
+
+
+@pytest.fixture
+def backbone_zip(tmp_path):
+    path = tmp_path / "backbone.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("backbone/Taxon.tsv", tsv(TAXON_HEADER, TAXA))
+        archive.writestr(
+            "backbone/VernacularName.tsv",
+            tsv(["taxonID", "vernacularName", "language"], VERNACULAR),
+        )
+    return str(path)
+
+
+@pytest.fixture
+def index(backbone_zip, tmp_path):
+    out = str(tmp_path / "backbone.sqlite3")
+    counts = import_backbone(backbone_zip, out)
+    assert counts["taxa"] == 3
+    assert counts["vernacular"] == 3  # "de" is filtered out
+    return BackboneIndex(out)
+
+
+def test_prefix_search(index):
+    results = index.search("panthera t")
+    assert [r["key"] for r in results] == [5219416]
+    assert results[0]["canonicalName"] == "Panthera tigris"
+
+
+def test_substring_search_joins_fts_rows_to_their_names(index):
+    # "ountain li" only matches inside a name, so this goes through names_fts.
+    results = index.search("ountain li")
+    assert [r["key"] for r in results] == [2435099]
+    assert results[0]["vernacularNames"] == [{"vernacularName": "Mountain lion"}]
+
+
+def test_fts_rowids_match_name_ids_after_vacuum(index):
+    conn = sqlite3.connect(index._path)
+    try:
+        rows = conn.execute(
+            "SELECT n.name, f.name FROM names_fts f JOIN names n ON n.id = f.rowid"
+        ).fetchall()
+    finally:
+        conn.close()
+    assert rows and all(a == b for a, b in rows)
+
+
+def test_index_from_older_schema_is_not_used(index):
+    assert index.available()
+    conn = sqlite3.connect(index._path)
+    conn.execute(f"PRAGMA user_version = {gbif_backbone.SCHEMA_VERSION - 1}")
+    conn.commit()
+    conn.close()
+    assert not BackboneIndex(index._path).available()
+
+
+def test_missing_vernacular_file_is_optional(tmp_path):
+    path = tmp_path / "taxa-only.zip"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("Taxon.tsv", tsv(TAXON_HEADER, TAXA))
+    out = str(tmp_path / "taxa-only.sqlite3")
+    counts = import_backbone(str(path), out)
+    assert counts == {"taxa": 3, "vernacular": 0, "seconds": counts["seconds"]}
+    assert BackboneIndex(out).search("puma")[0]["key"] == 2435099
@@ -0,0 +1,28 @@
+import pytest
+
+pytest.importorskip("requests")
+
+import gbif_client  # noqa: E402
+
+
+@pytest.fixture
+def detail_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(gbif_client, "species_detail", lambda key: calls.append(key) or {})
+    return calls
+
+
+def test_prefetch_is_skipped_with_the_local_backend(monkeypatch, detail_calls):
+    monkeypatch.setattr(gbif_client, "use_local_search", lambda: True)
+
+    assert gbif_client.prefetch_details([5219404, 5219416]) == []
+    assert detail_calls == []
+
+
+def test_prefetch_warms_details_with_the_api_backend(monkeypatch, detail_calls):
+    monkeypatch.setattr(gbif_client, "use_local_search", lambda: False)
+
+    futures = gbif_client.prefetch_details([5219404, None, 5219416])
+    for fut in futures:
+        fut.result(timeout=5)
+    assert sorted(detail_calls) == [5219404, 5219416]
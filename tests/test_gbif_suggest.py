@@ -0,0 +1,50 @@
+import gbif_suggest
+
+
+class FakeIndex:
+    def __init__(self, names, available=True):
+        self.names = names
+        self.searches = []
+        self._available = available
+
+    def available(self):
+        return self._available
+
+    def search(self, query, limit=20):
+        self.searches.append(query)
+        hits = [{"canonicalName": n} for n in self.names if n.lower().startswith(query)]
+        return hits[:limit]
+
+
+def test_complete_prefix_answers_longer_queries_from_the_trie():
+    index = FakeIndex(["Panthera leo", "Panthera tigris", "Pantholops hodgsonii"])
+    client = gbif_suggest.SuggestClient(index=index)
+
+    assert len(client.suggest("pant", limit=10)) == 3
+    names = [r["canonicalName"] for r in client.suggest("panthe", limit=10)]
+
+    assert names == ["Panthera leo", "Panthera tigris"]
+    assert index.searches == ["pant"]
+    assert client.stats() == {"served_from_trie": 1, "served_from_index": 1}
+
+
+def test_truncated_prefix_is_not_reused():
+    index = FakeIndex(["Panthera leo", "Panthera tigris", "Pantholops hodgsonii"])
+    client = gbif_suggest.SuggestClient(index=index)
+
+    client.suggest("pant", limit=2)
+    client.suggest("panth", limit=2)
+    assert index.searches == ["pant", "panth"]
+
+
+def test_vernacular_names_match():
+    result = {"canonicalName": "Panthera leo", "vernacularNames": [{"vernacularName": "African lion"}]}
+    assert gbif_suggest._matches(result, "lion")
+    assert not gbif_suggest._matches(result, "tiger")
+
+
+def test_no_index_means_no_suggestions():
+    index = FakeIndex(["Panthera leo"], available=False)
+    client = gbif_suggest.SuggestClient(index=index)
+    assert client.suggest("pan") == []
+    assert index.searches == []
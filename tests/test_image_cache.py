@@ -0,0 +1,93 @@
+import io
+
+import pytest
+
+pytest.importorskip("requests")
+Image = pytest.importorskip("PIL.Image")
+
+import config  # noqa: E402
+import image_cache  # noqa: E402
+
+SOURCE_URL = "https://example.invalid/lion.png"
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, content):
+        self.content = content
+        self.calls = 0
+
+    def get(self, url, timeout=None):
+        self.calls += 1
+        return FakeResponse(self.content)
+
+
+def png_bytes(size, mode="RGB"):
+    buf = io.BytesIO()
+    Image.new(mode, size, (200, 120, 40, 128)[: len(mode)]).save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "IMAGE_CACHE_ENABLED", True)
+    return image_cache.ImageCache(str(tmp_path), quality=80, workers=1)
+
+
+def test_fetch_writes_resized_webp_variants(cache):
+    cache._session = FakeSession(png_bytes((1600, 900)))
+
+    assert cache.fetch(SOURCE_URL)
+    assert cache.is_cached(SOURCE_URL)
+    for variant, edge in image_cache.VARIANTS.items():
+        with Image.open(cache.path(SOURCE_URL, variant)) as img:
+            assert img.format == "WEBP"
+            assert max(img.size) == edge
+            assert img.size[0] / img.size[1] == pytest.approx(1600 / 900, rel=0.01)
+
+    # Cached: no second download.
+    assert cache.fetch(SOURCE_URL)
+    assert cache._session.calls == 1
+
+
+def test_transparency_survives_encoding(cache):
+    cache._session = FakeSession(png_bytes((300, 300), mode="RGBA"))
+
+    assert cache.fetch(SOURCE_URL)
+    with Image.open(cache.path(SOURCE_URL, "thumb")) as img:
+        assert img.mode == "RGBA"
+        assert img.size == (300, 300)  # smaller than the edge: not upscaled
+
+
+def test_undecodable_image_is_not_cached(cache):
+    cache._session = FakeSession(b"not an image")
+
+    assert not cache.fetch(SOURCE_URL)
+    assert not cache.is_cached(SOURCE_URL)
+    assert cache.stats()["errors"] == 1
+
+
+def test_links_fall_back_to_original_url_when_not_serving(cache, monkeypatch):
+    cache._session = FakeSession(png_bytes((100, 100)))
+    assert cache.fetch(SOURCE_URL)
+
+    monkeypatch.setattr(config, "IMAGE_PROXY_PORT", 8599)
+    monkeypatch.setattr(config, "IMAGE_PROXY_PUBLIC_URL", "https://example.com/images/")
+    monkeypatch.setattr(image_cache, "_server", False)  # port was taken
+    assert cache.src(SOURCE_URL) == SOURCE_URL
+
+    monkeypatch.setattr(image_cache, "_server", object())
+    assert cache.src(SOURCE_URL) == f"https://example.com/images/{cache._name(SOURCE_URL, 'thumb')}"
+
+    monkeypatch.setattr(config, "IMAGE_PROXY_PUBLIC_URL", "")
+    assert cache.src(SOURCE_URL) == SOURCE_URL
+
+    monkeypatch.setattr(config, "IMAGE_PROXY_PORT", 0)
+    assert cache.src(SOURCE_URL) == cache.path(SOURCE_URL, "thumb")
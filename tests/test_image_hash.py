@@ -0,0 +1,55 @@
+import json
+import time
+
+import pytest
+
+pytest.importorskip("PIL")
+
+import image_hash  # noqa: E402
+
+
+def write_lines(path, entries):
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write((entry if isinstance(entry, str) else json.dumps(entry)) + "\n")
+
+
+def test_bad_journal_lines_are_skipped(tmp_path):
+    path = tmp_path / "near_dup.jsonl"
+    now = time.time()
+    write_lines(path, [
+        {"h": "ff00", "keys": {"cloud": "a"}, "created": now},
+        {"h": "ff01"},
+        {"h": "ff02", "keys": None, "created": "yesterday"},
+        "[1, 2]",
+        {"h": "ff03", "keys": {"cloud": "old"}, "created": now - 10_000},
+        '{"h": "ff0',
+    ])
+
+    index = image_hash.NearDuplicateIndex(path=str(path), ttl_seconds=3600)
+    assert len(index) == 1
+    assert index.lookup(0xFF00) == [(0, {"cloud": "a"})]
+    # The torn journal was rewritten, so appends start on a fresh line.
+    assert len(path.read_text().splitlines()) == 1
+
+
+def test_index_survives_a_restart(tmp_path):
+    path = str(tmp_path / "near_dup.jsonl")
+    image_hash.NearDuplicateIndex(path=path).add(0xABCD, {"cloud": "k"})
+    assert image_hash.NearDuplicateIndex(path=path).lookup(0xABCC) == [(1, {"cloud": "k"})]
+
+
+def test_compaction_keeps_entries_other_writers_appended(tmp_path, monkeypatch):
+    path = str(tmp_path / "near_dup.jsonl")
+    first = image_hash.NearDuplicateIndex(path=path)
+    second = image_hash.NearDuplicateIndex(path=path)
+    first.add(1 << 40, {"cloud": "first"})
+    second.add(2 << 40, {"cloud": "second"})  # `first` never saw this one
+
+    monkeypatch.setattr(image_hash.NearDuplicateIndex, "_needs_compaction", lambda self: True)
+    first.add(3 << 40, {"cloud": "third"})
+    monkeypatch.undo()
+
+    reloaded = image_hash.NearDuplicateIndex(path=path)
+    assert len(reloaded) == 3
+    assert len(first) == 3  # compaction also picked up the other writer's entry
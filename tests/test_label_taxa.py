@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+import label_taxa
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    """Every lookup 'finds' a taxon, so only the index decides the result."""
+    calls = []
+
+    def fake_taxon(name, via="vernacular"):
+        calls.append(name)
+        return {field: None for field in label_taxa.FIELDS} | {"canonicalName": name, "via": via}
+
+    monkeypatch.setattr(label_taxa, "_vernacular_match", fake_taxon)
+    monkeypatch.setattr(label_taxa, "_exact_match", fake_taxon)
+    return calls
+
+
+@pytest.mark.parametrize("index, label", [(517, "crane"), (673, "mouse"), (541, "drum"), (536, "dock")])
+def test_object_classes_resolve_to_none(resolver, index, label):
+    assert label_taxa.resolve_label(index, label) is None
+    assert resolver == []  # no network lookups for objects
+
+
+def test_organism_classes_resolve(resolver):
+    assert label_taxa.resolve_label(134, "crane")["canonicalName"] == "crane"
+    assert label_taxa.resolve_label(992, "agaric")["canonicalName"] == "agaric"
+
+
+def test_breed_ranges_use_the_species(resolver):
+    assert label_taxa.resolve_label(207, "golden retriever")["canonicalName"] == "Canis lupus familiaris"
+
+
+def test_table_is_keyed_by_class_index(resolver, tmp_path):
+    labels = ["crane"] * 600
+    path = tmp_path / "label_taxa.json"
+    label_taxa.build_table(labels, str(path), workers=4)
+
+    data = json.loads(path.read_text())
+    assert data["version"] == label_taxa.TABLE_VERSION
+
+    table = label_taxa.LabelTaxa(str(path))
+    assert table.lookup(134)["canonicalName"] == "crane"
+    assert table.lookup(517) is None
+    assert table.lookup(10_000) is None
+    assert table.indexes("crane") == list(range(600))
+
+
+def test_old_table_layout_is_ignored(tmp_path):
+    path = tmp_path / "label_taxa.json"
+    path.write_text(json.dumps({"version": 1, "labels": {"crane": [1]}}))
+    table = label_taxa.LabelTaxa(str(path))
+    assert not table.available()
+    assert table.version() == "none"
@@ -0,0 +1,119 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+
+import config
+import oss_store
+
+BUCKET = "animals"
+
+
+class PutObjectRequest:
+    def __init__(self, bucket, key):
+        self.bucket = bucket
+        self.key = key
+        self.body = None
+
+
+class LocalBucketClient:
+    """Stands in for oss.Client, storing objects as files under a directory."""
+
+    def __init__(self, root):
+        self.root = root
+        self.puts = []
+        self.multipart = []
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, *key.split("/"))
+
+    def _write(self, request, data):
+        path = self._path(request.bucket, request.key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return SimpleNamespace(etag=f'"{len(data)}"')
+
+    def is_object_exist(self, bucket, key):
+        return os.path.exists(self._path(bucket, key))
+
+    def put_object(self, request):
+        self.puts.append(request.key)
+        return self._write(request, request.body)
+
+    def uploader(self, part_size, parallel_num):
+        client = self
+
+        class Uploader:
+            def upload_from(self, request, reader):
+                client.multipart.append((request.key, part_size, parallel_num))
+                return client._write(request, reader.read())
+
+        return Uploader()
+
+
+@pytest.fixture
+def bucket(tmp_path, monkeypatch):
+    client = LocalBucketClient(str(tmp_path))
+    monkeypatch.setattr(oss_store, "OSS_AVAILABLE", True)
+    monkeypatch.setattr(oss_store, "oss", SimpleNamespace(PutObjectRequest=PutObjectRequest), raising=False)
+    monkeypatch.setattr(oss_store, "_client", client)
+    monkeypatch.setattr(config, "OSS_BUCKET", BUCKET)
+    monkeypatch.setattr(config, "OSS_PUBLIC_BASE_URL", "https://img.example.com/")
+    monkeypatch.setattr(config, "OSS_MULTIPART_THRESHOLD", 1024)
+    monkeypatch.setattr(config, "OSS_MULTIPART_PART_SIZE", 256)
+    monkeypatch.setattr(config, "OSS_MULTIPART_PARALLEL", 2)
+    return client
+
+
+def test_object_names_are_content_addressed():
+    a = oss_store.content_object_name(b"lion", "jpg")
+    assert a == oss_store.content_object_name(b"lion", "jpg")
+    assert a != oss_store.content_object_name(b"tiger", "jpg")
+    assert a.startswith("animal-images/") and a.endswith(".jpg")
+
+
+def test_same_content_is_uploaded_once(bucket):
+    data = b"lion" * 10
+    name = oss_store.content_object_name(data, "jpg")
+
+    first = oss_store.upload_bytes(data, name)
+    second = oss_store.upload_bytes(data, oss_store.content_object_name(data, "jpg"))
+
+    assert first["success"] and not first["deduplicated"]
+    assert second["success"] and second["deduplicated"]
+    assert second["url"] == first["url"] == f"https://img.example.com/{name}"
+    assert bucket.puts == [name]
+
+
+def test_small_payloads_use_a_single_put(bucket):
+    data = b"x" * 1023
+    name = oss_store.content_object_name(data, "png")
+
+    assert oss_store.upload_bytes(data, name)["success"]
+    assert bucket.puts == [name]
+    assert bucket.multipart == []
+
+
+def test_payloads_at_the_threshold_use_multipart(bucket):
+    data = b"x" * 1024
+    name = oss_store.content_object_name(data, "png")
+
+    result = oss_store.upload_bytes(data, name)
+
+    assert result["success"] and result["etag"] == '"1024"'
+    assert bucket.puts == []
+    assert bucket.multipart == [(name, 256, 2)]
+    with open(bucket._path(BUCKET, name), "rb") as f:
+        assert f.read() == data
+
+
+def test_client_errors_are_reported(bucket, monkeypatch):
+    def boom(bucket, key):
+        raise RuntimeError("endpoint unreachable")
+
+    monkeypatch.setattr(bucket, "is_object_exist", boom)
+    assert oss_store.upload_bytes(b"lion", "animal-images/x.jpg") == {
+        "success": False,
+        "error": "endpoint unreachable",
+    }
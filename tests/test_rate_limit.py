@@ -0,0 +1,75 @@
+import threading
+import time
+
+import rate_limit
+from rate_limit import PRIORITY_BATCH, PRIORITY_INTERACTIVE, CloudScheduler
+
+
+def drained_scheduler(per_minute: float = 600) -> CloudScheduler:
+    scheduler = CloudScheduler(requests_per_minute=per_minute, tokens_per_minute=0)
+    scheduler._requests._level = 0  # every grant waits for a refill
+    return scheduler
+
+
+def test_interactive_requests_jump_ahead_of_batch_work():
+    scheduler = drained_scheduler()
+    order = []
+
+    def worker(name, priority):
+        scheduler.acquire(priority=priority, timeout=5)
+        order.append(name)
+
+    batch = [threading.Thread(target=worker, args=(f"batch{i}", PRIORITY_BATCH)) for i in range(2)]
+    for t in batch:
+        t.start()
+    time.sleep(0.02)  # batch work is queued first
+    interactive = threading.Thread(target=worker, args=("interactive", PRIORITY_INTERACTIVE))
+    interactive.start()
+
+    for t in batch + [interactive]:
+        t.join(5)
+    assert order[0] == "interactive"
+    assert sorted(order[1:]) == ["batch0", "batch1"]
+
+
+def test_same_priority_is_fifo():
+    scheduler = drained_scheduler()
+    order = []
+    threads = []
+    for i in range(3):
+        t = threading.Thread(target=lambda i=i: (scheduler.acquire(timeout=5), order.append(i)))
+        t.start()
+        threads.append(t)
+        time.sleep(0.02)
+    for t in threads:
+        t.join(5)
+    assert order == [0, 1, 2]
+
+
+def test_full_queue_rejects():
+    scheduler = CloudScheduler(requests_per_minute=1, tokens_per_minute=0, max_queue=1)
+    scheduler._requests._level = 0
+    t = threading.Thread(target=lambda: _swallow(scheduler.acquire, timeout=0.3))
+    t.start()
+    time.sleep(0.05)
+    try:
+        scheduler.acquire(timeout=0.1)
+    except rate_limit.RateLimitQueueFull:
+        pass
+    else:
+        raise AssertionError("expected RateLimitQueueFull")
+    t.join(1)
+
+
+def test_record_usage_reconciles_the_token_budget():
+    scheduler = CloudScheduler(requests_per_minute=0, tokens_per_minute=10000)
+    scheduler.acquire(tokens=3000)
+    scheduler.record_usage(3000, 1000)
+    assert scheduler._tokens._level == 9000
+
+
+def _swallow(fn, **kwargs):
+    try:
+        fn(**kwargs)
+    except rate_limit.RateLimitTimeout:
+        pass
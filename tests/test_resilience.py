@@ -0,0 +1,89 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import resilience
+from resilience import BREAKER_HALF_OPEN, BREAKER_OPEN, CircuitBreaker
+
+
+def half_open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, cooldown_seconds=0)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.status()["state"] == BREAKER_OPEN
+    assert breaker.allow()  # cooldown over: this is the trial call
+    assert breaker.status()["state"] == BREAKER_HALF_OPEN
+    return breaker
+
+
+def test_caller_error_keeps_breaker_half_open():
+    breaker = half_open_breaker()
+    breaker.record_error(service_failure=False)
+
+    status = breaker.status()
+    assert status["state"] == BREAKER_HALF_OPEN
+    assert status["failures"] == 1
+    assert breaker.allow()  # the trial slot is free for the next caller
+
+
+def test_service_error_reopens_half_open_breaker():
+    breaker = half_open_breaker()
+    breaker.record_error(service_failure=True)
+    assert breaker.status()["state"] == BREAKER_OPEN
+
+
+def test_released_trial_lets_next_call_probe():
+    breaker = half_open_breaker()
+    assert not breaker.allow()
+    breaker.release_trial()
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.status()["state"] == "closed"
+
+
+@pytest.fixture
+def saturated_cloud_pool(monkeypatch):
+    """A two-worker cloud pool with both workers stuck in slow calls."""
+    release = threading.Event()
+    pool = ThreadPoolExecutor(max_workers=2)
+    for _ in range(2):
+        pool.submit(release.wait, 30)
+    monkeypatch.setattr(resilience, "HEDGE_EXECUTOR", pool)
+    monkeypatch.setattr(resilience, "FALLBACK_EXECUTOR", ThreadPoolExecutor(max_workers=1))
+    yield
+    release.set()
+    pool.shutdown(wait=True)
+
+
+def test_local_fallback_arrives_within_budget_when_cloud_pool_is_full(saturated_cloud_pool):
+    budget = 0.2
+    started = time.monotonic()
+    name, result = resilience.run_hedged(
+        [("cloud", lambda: "cloud answer"), ("local", lambda: "local answer")],
+        budget_seconds=budget,
+    )
+    elapsed = time.monotonic() - started
+
+    assert (name, result) == ("local", "local answer")
+    assert elapsed < budget + 1.0
+
+
+def test_primary_wins_when_fast():
+    assert resilience.run_hedged(
+        [("cloud", lambda: "cloud answer"), ("local", lambda: "local answer")],
+        budget_seconds=5,
+    ) == ("cloud", "cloud answer")
+
+
+def test_failed_primary_starts_fallback_immediately():
+    def broken():
+        raise RuntimeError("boom")
+
+    started = time.monotonic()
+    name, _ = resilience.run_hedged(
+        [("cloud", broken), ("local", lambda: "local answer")], budget_seconds=5
+    )
+    assert name == "local"
+    assert time.monotonic() - started < 1.0